@@ -0,0 +1,20 @@
+from typing import Any, Dict
+
+from cache import cache, frequency
+from db import msearch
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get(
+    "/stats",
+    description="Статистика кэша процесса: попадания по уровням, частота обращений к ключам и размеры пакетов _msearch. Доступна только из внутренней сети.",
+)
+async def cache_stats() -> Dict[str, Any]:
+    storage = cache.storage
+    return {
+        "tiers": storage.stats() if hasattr(storage, "stats") else {},
+        "frequency": frequency.tracker.stats() if frequency.tracker else {},
+        "msearch": msearch.batcher.stats() if msearch.batcher else {},
+    }
@@ -1,18 +1,21 @@
 from http import HTTPStatus
 from typing import List
 
+from cache.surrogate import get_surrogate_keys
 from dto.dto import FilmDetailsDTO, FilmDTO
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from models.film import Film
 from models.genre import Genre
-from services.film import BaseService, get_film_service
-from services.genre import get_genre_service
+from services.film import FILM_FIELDS, BaseService, get_film_service
+from services.genre import GenreService, get_genre_service
+from services.response_cache import ResponseCache, get_response_cache
 from utils.utils import (
+    FieldsQueryParams,
     FilmsFilterQueryParams,
     FilmsFilterQueryParamsSearch,
     FilmsSortQueryParams,
+    InvalidCursor,
+    get_pagination_headers,
     get_pagination_params,
-    update_headers,
 )
 
 router = APIRouter()
@@ -25,19 +28,34 @@ router = APIRouter()
 )
 async def search_by_films(
     request: Request,
-    response: Response,
     query: FilmsFilterQueryParamsSearch = Depends(),
     pagination: dict = Depends(get_pagination_params),
+    fields: FieldsQueryParams = Depends(),
     film_service: BaseService = Depends(get_film_service),
-) -> List[FilmDTO]:
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
     """query забираю из request.url. Не удалять!"""
-    films = await film_service.get_objects(request=request)
+    selected = fields.get_fields(FILM_FIELDS)
+    key = await response_cache.get_key(["films"], pagination)
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    try:
+        films = await film_service.get_objects(request=request, fields=selected)
+    except InvalidCursor:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Films not found")
 
-    await update_headers(response, pagination, films)
-
-    return films
+    return await response_cache.put(
+        key,
+        List[film_service.get_model(selected)] if selected else List[FilmDTO],
+        films,
+        film_service.expire,
+        get_pagination_headers(pagination, films, request.state.next_cursor),
+        surrogate_keys=["films", *get_surrogate_keys("films", [film.id for film in films])],
+    )
 
 
 
@@ -50,23 +68,26 @@ async def search_by_films(
 async def film_details(
     film_id: str,
     film_service: BaseService = Depends(get_film_service),
-    genre_service: BaseService = Depends(get_genre_service),
-) -> Film:
+    genre_service: GenreService = Depends(get_genre_service),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    key = await response_cache.get_key(["films", "genres"])
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
     film = await film_service.get_by_id(film_id)
     if not film:
         # Если фильм не найден, отдаём 404 статус
         # Желательно пользоваться уже определёнными HTTP-статусами, которые содержат enum, такой код будет более поддерживаемым
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Film not found")
 
-    if film.genres:
-        genres: List[Genre] = []
-        for genre_name in film.genres:
-            genre: Genre | None = await genre_service.get_genre_by_name(genre_name=genre_name)
-            if genre:
-                genres.append(genre)
-    film.genres = genres
+    genres: List[Genre] = await genre_service.get_genres_by_names(film.genres or [])
 
-    return film
+    # Модель может быть общей для одновременных запросов, поэтому не изменяем её, а копируем.
+    film = film.model_copy(update={"genres": genres})
+    surrogate_keys = get_surrogate_keys("films", [film.id]) + get_surrogate_keys("genres", [genre.id for genre in genres])
+    return await response_cache.put(key, FilmDetailsDTO, film, film_service.expire, surrogate_keys=surrogate_keys)
 
 
 
@@ -78,13 +99,15 @@ async def film_details(
 )
 async def get_films(
     request: Request,
-    response: Response,
     film_service: BaseService = Depends(get_film_service),
-    genre_service: BaseService = Depends(get_genre_service),
+    genre_service: GenreService = Depends(get_genre_service),
     pagination: dict = Depends(get_pagination_params),
     sort: FilmsSortQueryParams = Depends(),
     filter_: FilmsFilterQueryParams = Depends(),
-) -> List[Film]:
+    fields: FieldsQueryParams = Depends(),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    selected = fields.get_fields(FILM_FIELDS)
     if sort.sort_by is not None:
         if sort.sort_by not in ["-imdb_rating", "imdb_rating"]:
             raise HTTPException(
@@ -92,6 +115,11 @@ async def get_films(
                 detail='Разрешенная сортировка: "-imdb_rating", "imdb_rating"',
             )
 
+    key = await response_cache.get_key(["films", "genres"], pagination)
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
     if filter_.query:
         if filter_.filter_by == "imdb_rating":
             if not filter_.query.isdigit():
@@ -101,18 +129,24 @@ async def get_films(
                 )
         else:
             if filter_.filter_by == "genre":
-                # Поиск в genres регистрозависимый, тк mapping для genres - "text", а не "keyword".
-                # Чтобы поиск удался, первую букву делаю заглавной.
-                filter_.query = filter_.query.capitalize()
+                # Название жанра ищется без учёта регистра, в запрос к фильмам подставляется название из индекса.
                 genre_model: Genre | None = await genre_service.get_genre_by_name(genre_name=filter_.query)
                 if not genre_model:
                     raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Genre not found")
                 request.query_params.__dict__["_dict"]["genre"] = genre_model.name
 
-    films = await film_service.get_objects(request=request)
+    try:
+        films = await film_service.get_objects(request=request, fields=selected)
+    except InvalidCursor:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Films not found")
 
-    await update_headers(response, pagination, films)
-
-    return films
+    return await response_cache.put(
+        key,
+        List[film_service.get_model(selected)] if selected else List[FilmDTO],
+        films,
+        film_service.expire,
+        get_pagination_headers(pagination, films, request.state.next_cursor),
+        surrogate_keys=["films", "genres", *get_surrogate_keys("films", [film.id for film in films])],
+    )
@@ -1,35 +1,60 @@
 from http import HTTPStatus
 from typing import List
 
+from cache.surrogate import get_surrogate_keys
 from dto.dto import GenreDTO
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from models.genre import Genre
 from services.genre import GenreService, get_genre_service
-from utils.utils import get_pagination_params, update_headers
+from services.response_cache import ResponseCache, get_response_cache
+from utils.utils import InvalidCursor, get_pagination_headers, get_pagination_params
 
 router = APIRouter()
 
 
 @router.get("/{genre_id}", response_model=GenreDTO, description="Детальная информация по жанру.")
-async def genre_details(genre_id: str, genre_service: GenreService = Depends(get_genre_service)) -> GenreDTO:
+async def genre_details(
+    genre_id: str,
+    genre_service: GenreService = Depends(get_genre_service),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    key = await response_cache.get_key(["genres"])
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
     genre = await genre_service.get_by_id(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
 
-    return genre
+    return await response_cache.put(
+        key, GenreDTO, genre, genre_service.expire, surrogate_keys=get_surrogate_keys("genres", [genre.id])
+    )
 
 
 @router.get("", response_model=List[GenreDTO], description="Список жанров")
 async def get_genres(
     request: Request,
-    response: Response,
     genre_service: GenreService = Depends(get_genre_service),
     pagination: dict = Depends(get_pagination_params),
-) -> List[Genre]:
-    genres = await genre_service.get_objects(request=request)
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    key = await response_cache.get_key(["genres"], pagination)
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    try:
+        genres = await genre_service.get_objects(request=request)
+    except InvalidCursor:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     if not genres:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Genres not found")
 
-    await update_headers(response, pagination, genres)
-
-    return genres
+    return await response_cache.put(
+        key,
+        List[GenreDTO],
+        genres,
+        genre_service.expire,
+        get_pagination_headers(pagination, genres, request.state.next_cursor),
+        surrogate_keys=["genres", *get_surrogate_keys("genres", [genre.id for genre in genres])],
+    )
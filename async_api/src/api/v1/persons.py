@@ -1,36 +1,70 @@
 from http import HTTPStatus
-from typing import List
+from typing import Dict, List
 
+from cache.surrogate import get_surrogate_keys
 from dto.dto import FilmDTO, PersonDetailsDTO
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from models.film import Film
 from models.person import Person
-from services.film import BaseService, FilmService, get_film_service
+from services.film import FILM_FIELDS, BaseService, FilmService, get_film_service
 from services.person import get_person_service
+from services.response_cache import ResponseCache, get_response_cache
 from utils.utils import (
+    FieldsQueryParams,
+    FilmsSortQueryParams,
+    InvalidCursor,
     PersonsFilterQueryParamsSearch,
+    get_pagination_headers,
     get_pagination_params,
-    update_headers,
 )
 
 router = APIRouter()
 
+# Поля фильма, по которым person_to_dto определяет роли персоны.
+ROLE_FIELDS = ["id", "actors_names", "directors_names", "writers_names"]
+
+
+def person_to_dto(person: Person, films: Dict[str, Film]) -> PersonDetailsDTO:
+    """Собрать DTO персоны.
+
+    Роли берутся из документа персоны (films). Для документов без ролей роли определяются по именам
+    в фильмах - films, заранее загруженных одним запросом через film_service.get_many.
+    """
+    if person.films is not None:
+        return PersonDetailsDTO(
+            id=person.id,
+            full_name=person.full_name,
+            films=[{"uuid": film.id, "roles": film.roles} for film in person.films],
+        )
 
-async def person_to_dto(person: Person, film_service: FilmService) -> PersonDetailsDTO:
     dto = PersonDetailsDTO(id=person.id, full_name=person.full_name, films=[])
-    for i, film_id in enumerate(person.movies):
-        film = await film_service.get_by_id(id_=film_id)
-        dto.films.append({"uuid": film.id, "roles": []})  # type: ignore
+    for film_id in person.movies or []:
+        roles: List[str] = []
+        film = films.get(film_id)
         if film:
-            if dto.full_name in film.actors_names:  # type: ignore
-                dto.films[i]["roles"].append("actor")  # type: ignore
-            if dto.full_name in film.directors_names:  # type: ignore
-                dto.films[i]["roles"].append("director")  # type: ignore
-            if dto.full_name in film.writers_names:  # type: ignore
-                dto.films[i]["roles"].append("writer")  # type: ignore
+            if dto.full_name in (film.actors_names or []):
+                roles.append("actor")
+            if dto.full_name in (film.directors_names or []):
+                roles.append("director")
+            if dto.full_name in (film.writers_names or []):
+                roles.append("writer")
+        dto.films.append({"uuid": film_id, "roles": roles})
 
     return dto
 
 
+async def get_persons_films(persons: List[Person], film_service: FilmService) -> Dict[str, Film]:
+    """Загрузить разом, без повторов, фильмы персон, для которых роли не сохранены в документе."""
+    film_ids = list(
+        dict.fromkeys(
+            film_id for person in persons if person.films is None for film_id in person.movies or []
+        )
+    )
+    if not film_ids:
+        return {}
+    films = await film_service.get_many(film_ids, fields=ROLE_FIELDS)
+    return {film.id: film for film in films}
+
 
 @router.get(
     "/search",
@@ -39,25 +73,41 @@ async def person_to_dto(person: Person, film_service: FilmService) -> PersonDeta
 )
 async def search_by_persons(
     request: Request,
-    response: Response,
     query: PersonsFilterQueryParamsSearch = Depends(),
     pagination: dict = Depends(get_pagination_params),
     person_service: BaseService = Depends(get_person_service),
     film_service: BaseService = Depends(get_film_service),
-) -> List[PersonDetailsDTO]:
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
     """query для поискового запроса в еластик беру из request.url. Не удалять!"""
-    persons = await person_service.get_objects(request=request)
+    key = await response_cache.get_key(["persons", "films"], pagination)
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
+    try:
+        persons = await person_service.get_objects(request=request)
+    except InvalidCursor:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     if not persons:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Persons not found")
 
-    result: List[PersonDetailsDTO] = []
-    for person in persons:
-        dto = await person_to_dto(person=person, film_service=film_service)
-        result.append(dto)
+    films = await get_persons_films(persons, film_service)
+    result: List[PersonDetailsDTO] = [person_to_dto(person=person, films=films) for person in persons]
 
-    await update_headers(response, pagination, result)
-
-    return result
+    return await response_cache.put(
+        key,
+        List[PersonDetailsDTO],
+        result,
+        person_service.expire,
+        get_pagination_headers(pagination, result, request.state.next_cursor),
+        surrogate_keys=[
+            "persons",
+            "films",
+            *get_surrogate_keys("persons", [person.id for person in persons]),
+            *get_surrogate_keys("films", films),
+        ],
+    )
 
 
 @router.get(
@@ -69,12 +119,21 @@ async def person_details(
     person_id: str,
     person_service: BaseService = Depends(get_person_service),
     film_service: BaseService = Depends(get_film_service),
-) -> PersonDetailsDTO:
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    key = await response_cache.get_key(["persons", "films"])
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
     person = await person_service.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
 
-    return await person_to_dto(person=person, film_service=film_service)
+    films = await get_persons_films([person], film_service)
+    dto = person_to_dto(person=person, films=films)
+    surrogate_keys = get_surrogate_keys("persons", [person.id]) + get_surrogate_keys("films", films)
+    return await response_cache.put(key, PersonDetailsDTO, dto, person_service.expire, surrogate_keys=surrogate_keys)
 
 
 
@@ -87,21 +146,55 @@ async def person_details(
 )
 async def person_films(
     request: Request,
-    response: Response,
     person_id: str,
     person_service: BaseService = Depends(get_person_service),
     film_service: BaseService = Depends(get_film_service),
     pagination: dict = Depends(get_pagination_params),
-) -> List[FilmDTO]:
-    """person_id для поискового запроса в еластик беру из request.path_params"""
+    sort: FilmsSortQueryParams = Depends(),
+    fields: FieldsQueryParams = Depends(),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    """Фильмы берутся по списку movies персоны через кэш фильмов.
+
+    person_id для поискового запроса в еластик (если у персоны нет movies) беру из request.path_params
+    """
+    selected = fields.get_fields(FILM_FIELDS)
+    if sort.sort_by is not None and sort.sort_by not in ["-imdb_rating", "imdb_rating"]:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Разрешенная сортировка: "-imdb_rating", "imdb_rating"',
+        )
+    key = await response_cache.get_key(["films", "persons"], pagination)
+    cached = await response_cache.get(key)
+    if cached:
+        return cached
+
     person = await person_service.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
 
-    films = await film_service.get_objects(request=request)
+    film_ids = person.get_film_ids()
+    try:
+        if film_ids is None:
+            # В документе персоны нет списка фильмов - ищем фильмы по участникам.
+            films = await film_service.get_objects(request=request, fields=selected)
+            next_cursor = request.state.next_cursor
+        else:
+            films, next_cursor = await film_service.get_page(film_ids, pagination, sort.sort_by, selected)
+    except InvalidCursor:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Films not found")
 
-    await update_headers(response, pagination, films)
-
-    return films
+    return await response_cache.put(
+        key,
+        List[film_service.get_model(selected)] if selected else List[FilmDTO],
+        films,
+        film_service.expire,
+        get_pagination_headers(pagination, films, next_cursor),
+        surrogate_keys=[
+            "films",
+            *get_surrogate_keys("persons", [person.id]),
+            *get_surrogate_keys("films", [film.id for film in films]),
+        ],
+    )
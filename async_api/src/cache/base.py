@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def get_namespace_ttl(namespace_ttls: Dict[str, int], key: str, expire: int | None) -> int | None:
+    """Срок хранения ключа с учётом ограничения для его пространства имён - префикса до первого ":"."""
+    namespace_ttl = namespace_ttls.get(key.split(":", 1)[0])
+    if expire and namespace_ttl:
+        return min(expire, namespace_ttl)
+    return expire or namespace_ttl
+
+
+class BaseCacheStorage(ABC):
+    """Абстрактное хранилище кэша.
+
+    Позволяет сохранять и получать кэш.
+    Способ хранения кэша может варьироваться в зависимости
+    от итоговой реализации. Например, можно хранить информацию
+    в базе данных или в распределённом файловом хранилище.
+    """
+
+    @abstractmethod
+    def save_cache(self, key: str, cache: Dict[str, Any], expire: int | None = None) -> None:
+        """Сохранить кэш в хранилище."""
+
+    @abstractmethod
+    def retrieve_cache(self, key: str) -> Dict[str, Any]:
+        """Получить кэш из хранилища."""
+
+    @abstractmethod
+    def delete_cache(self, key: str) -> None:
+        """Удалить кэш из хранилища."""
+
+    async def retrieve_with_ttl(self, key: str) -> Tuple[Any, Optional[float]]:
+        """Получить кэш и оставшийся срок его хранения в секундах. None - срок не ограничен или неизвестен.
+
+        Нужен многоуровневому хранилищу: значение, скопированное в верхний уровень, не должно жить дольше,
+        чем в уровне, из которого оно получено.
+        """
+        return await self.retrieve_cache(key), None
+
+    async def retrieve_many_with_ttl(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, Optional[float]]]:
+        """Получить несколько значений с оставшимися сроками хранения (см. retrieve_with_ttl).
+
+        Реализация по умолчанию получает значения по одному.
+        """
+        result = {}
+        for key in keys:
+            cache, ttl = await self.retrieve_with_ttl(key)
+            if cache is not None:
+                result[key] = (cache, ttl)
+        return result
+
+    async def save_many(self, items: Dict[str, Any], expire: int | None = None) -> None:
+        """Сохранить несколько значений в хранилище.
+
+        Реализация по умолчанию сохраняет значения по одному.
+        Хранилища, поддерживающие пакетные операции, переопределяют метод.
+        """
+        for key, cache in items.items():
+            await self.save_cache(key, cache, expire)
+
+    async def retrieve_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получить несколько значений из хранилища. Отсутствующие ключи в результат не попадают."""
+        result = {}
+        for key in keys:
+            cache = await self.retrieve_cache(key)
+            if cache is not None:
+                result[key] = cache
+        return result
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Удалить несколько значений из хранилища."""
+        for key in keys:
+            await self.delete_cache(key)
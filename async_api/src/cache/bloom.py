@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+import math
+from typing import Dict, Iterable, Optional, Set
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+
+class BloomFilter:
+    """Фильтр Блума: компактное множество строк с ложноположительными, но без ложноотрицательных ответов.
+
+    capacity (int) - ожидаемое количество элементов.
+    error_rate (float) - допустимая доля ложноположительных ответов при capacity элементах.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Двойное хэширование: k позиций из двух независимых 64-битных хэшей.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class IdFilters:
+    """Фильтры Блума существующих id для каждого пространства имён кэша.
+
+    Позволяют ответить 404 на запрос несуществующего id, не обращаясь ни к Redis, ни к elasticsearch.
+    Фильтры периодически перестраиваются по индексам elasticsearch.
+    Пока фильтр пространства имён не построен, любой id считается возможно существующим.
+    id, добавленные во время перестроения, запоминаются и переносятся в новый фильтр:
+    обход индекса мог их не застать.
+    """
+
+    def __init__(self, elastic: AsyncElasticsearch, indexes: Dict[str, str], error_rate: float = 0.01) -> None:
+        self.elastic = elastic
+        # namespace -> индекс elasticsearch
+        self.indexes = indexes
+        self.error_rate = error_rate
+        self._filters: Dict[str, BloomFilter] = {}
+        # namespace -> id, добавленные во время перестроения фильтра.
+        self._added_during_rebuild: Dict[str, Set[str]] = {}
+
+    def might_contain(self, namespace: str, id_: str) -> bool:
+        bloom = self._filters.get(namespace)
+        return bloom is None or id_ in bloom
+
+    def add(self, namespace: str, id_: str) -> None:
+        bloom = self._filters.get(namespace)
+        if bloom is not None:
+            bloom.add(id_)
+        added = self._added_during_rebuild.get(namespace)
+        if added is not None:
+            added.add(id_)
+
+    async def rebuild(self, namespace: str) -> None:
+        index = self.indexes[namespace]
+        added = self._added_during_rebuild[namespace] = set()
+        try:
+            ids = [
+                doc["_id"]
+                async for doc in async_scan(
+                    self.elastic, index=index, query={"query": {"match_all": {}}}, _source=False
+                )
+            ]
+            # Запас по ёмкости для id, добавленных между перестроениями.
+            bloom = BloomFilter(capacity=(len(ids) + len(added)) * 2, error_rate=self.error_rate)
+            for id_ in ids:
+                bloom.add(id_)
+            # Между слиянием и заменой фильтра нет await, поэтому новые id не теряются.
+            for id_ in added:
+                bloom.add(id_)
+            self._filters[namespace] = bloom
+        finally:
+            if self._added_during_rebuild.get(namespace) is added:
+                del self._added_during_rebuild[namespace]
+        logging.info("bloom filter for %s rebuilt: %s ids", namespace, len(ids))
+
+    async def run(self, interval: float) -> None:
+        """Перестраивать фильтры каждые interval секунд."""
+        while True:
+            for namespace in self.indexes:
+                try:
+                    await self.rebuild(namespace)
+                except Exception:
+                    # Ошибка перестроения не должна останавливать сервис: остаётся предыдущий фильтр.
+                    logging.exception("bloom filter for %s was not rebuilt", namespace)
+            await asyncio.sleep(interval)
+
+
+# Инициализируется в lifespan, если фильтр включён в настройках.
+id_filters: Optional[IdFilters] = None
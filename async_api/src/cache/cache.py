@@ -1,27 +1,23 @@
 import logging
-from abc import ABC, abstractmethod
-from typing import Any, Dict
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from db.redis import get_redis
+from cache import frequency
+from cache.base import BaseCacheStorage
+from cache.codec import CacheSerializer, build_serializer
+from cache.memory import InMemoryCacheStorage
+from cache.shared import SharedMemoryCacheStorage
+from core.config import settings
 from redis.asyncio import Redis
 
-
-class BaseCacheStorage(ABC):
-    """Абстрактное хранилище кэша.
-
-    Позволяет сохранять и получать кэш.
-    Способ хранения кэша может варьироваться в зависимости
-    от итоговой реализации. Например, можно хранить информацию
-    в базе данных или в распределённом файловом хранилище.
-    """
-
-    @abstractmethod
-    def save_cache(self, key: str, cache: Dict[str, Any], expire: int | None = None) -> None:
-        """Сохранить кэш в хранилище."""
-
-    @abstractmethod
-    def retrieve_cache(self, key: str) -> Dict[str, Any]:
-        """Получить кэш из хранилища."""
+# Хранилище кэша процесса. Инициализируется в lifespan, т.к. L1-кэш должен жить между запросами.
+storage: Optional[BaseCacheStorage] = None
+serializer: CacheSerializer = build_serializer(
+    settings.CACHE_CODEC, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESSION_THRESHOLD_IN_BYTES
+)
 
 
 class RedisCacheStorage(BaseCacheStorage):
@@ -39,12 +35,197 @@ class RedisCacheStorage(BaseCacheStorage):
         logging.debug(cache)
         return cache
 
+    async def delete_cache(self, key: str) -> None:
+        """Удалить кэш из хранилища."""
+        await self.redis_adapter.delete(key)
+
+    @staticmethod
+    def _to_ttl(pttl: int) -> Optional[float]:
+        # PTTL: -1 - ключ без срока, -2 - ключа нет.
+        return pttl / 1000 if pttl >= 0 else None
+
+    async def retrieve_with_ttl(self, key: str) -> Tuple[Any, Optional[float]]:
+        """Получить кэш и оставшийся срок его хранения (PTTL) за один запрос."""
+        async with self.redis_adapter.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            cache, pttl = await pipe.execute()
+        return cache, self._to_ttl(pttl)
+
+    async def retrieve_many_with_ttl(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, Optional[float]]]:
+        """Получить несколько значений с оставшимися сроками хранения за один запрос (MGET и PTTL в pipeline)."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        async with self.redis_adapter.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *pttls = await pipe.execute()
+        return {
+            key: (cache, self._to_ttl(pttl)) for key, cache, pttl in zip(keys, values, pttls) if cache is not None
+        }
+
+    async def save_many(self, items: Dict[str, Any], expire: int | None = None) -> None:
+        """Сохранить несколько значений в хранилище за один запрос (pipeline)."""
+        async with self.redis_adapter.pipeline(transaction=False) as pipe:
+            for key, cache in items.items():
+                pipe.set(key, cache, ex=expire)
+            await pipe.execute()
+
+    async def retrieve_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получить несколько значений из хранилища за один запрос (MGET)."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self.redis_adapter.mget(keys)
+        return {key: cache for key, cache in zip(keys, values) if cache is not None}
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Удалить несколько значений из хранилища за один запрос."""
+        keys = list(keys)
+        if keys:
+            await self.redis_adapter.delete(*keys)
+
+
+def get_copy_expire(ttl: Optional[float]) -> Optional[int]:
+    """Срок хранения копии значения в верхнем уровне по оставшемуся сроку в нижнем, с округлением вверх до секунды.
+
+    None - срок в нижнем уровне не ограничен, копия хранится по настройкам верхнего уровня.
+    """
+    # 0 в save_cache означает срок по умолчанию, поэтому копия живёт хотя бы секунду.
+    return max(1, math.ceil(ttl)) if ttl is not None else None
+
+
+class TieredCacheStorage(BaseCacheStorage):
+    """Многоуровневое хранилище кэша.
+
+    Уровни опрашиваются по порядку: от самого быстрого (память процесса) к самому медленному (Redis).
+    При попадании в нижний уровень значение копируется во все верхние уровни на оставшийся в нём срок хранения,
+    поэтому копия не переживает оригинал (например, отрицательную запись или кэш ответа с коротким сроком).
+    Для каждого уровня ведётся подсчёт попаданий и промахов.
+    """
+
+    def __init__(self, tiers: Dict[str, BaseCacheStorage]) -> None:
+        self.tiers = tiers
+        self.hits = {name: 0 for name in tiers}
+        self.misses = {name: 0 for name in tiers}
+
+    async def save_cache(self, key: str, cache: Any, expire: int | None = None) -> None:
+        """Сохранить кэш во все уровни."""
+        for tier in self.tiers.values():
+            await tier.save_cache(key, cache, expire)
+
+    async def retrieve_cache(self, key: str) -> Any:
+        """Получить кэш из первого уровня, в котором он есть."""
+        missed: List[BaseCacheStorage] = []
+        for name, tier in self.tiers.items():
+            if not missed:
+                # Срок хранения нужен только для копирования в верхние уровни.
+                cache, ttl = await tier.retrieve_cache(key), None
+            else:
+                cache, ttl = await tier.retrieve_with_ttl(key)
+            if cache is None:
+                self.misses[name] += 1
+                missed.append(tier)
+                continue
+
+            self.hits[name] += 1
+            expire = get_copy_expire(ttl)
+            for upper_tier in missed:
+                await upper_tier.save_cache(key, cache, expire)
+            return cache
+
+        return None
+
+    async def delete_cache(self, key: str) -> None:
+        """Удалить кэш из всех уровней."""
+        for tier in self.tiers.values():
+            await tier.delete_cache(key)
+
+    async def save_many(self, items: Dict[str, Any], expire: int | None = None) -> None:
+        """Сохранить несколько значений во все уровни."""
+        for tier in self.tiers.values():
+            await tier.save_many(items, expire)
+
+    async def retrieve_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получить несколько значений: каждый уровень опрашивается одним запросом только по оставшимся ключам."""
+        result: Dict[str, Any] = {}
+        remaining = list(keys)
+        missed: List[BaseCacheStorage] = []
+        for name, tier in self.tiers.items():
+            if not remaining:
+                break
+            if not missed:
+                found = await tier.retrieve_many(remaining)
+            else:
+                found_with_ttl = await tier.retrieve_many_with_ttl(remaining)
+                found = {key: cache for key, (cache, _) in found_with_ttl.items()}
+                # Значения с одинаковым (до секунды) оставшимся сроком копируются одним пакетом.
+                groups: Dict[Optional[int], Dict[str, Any]] = {}
+                for key, (cache, ttl) in found_with_ttl.items():
+                    groups.setdefault(get_copy_expire(ttl), {})[key] = cache
+                for upper_tier in missed:
+                    for expire, group in groups.items():
+                        await upper_tier.save_many(group, expire)
+            self.hits[name] += len(found)
+            self.misses[name] += len(remaining) - len(found)
+            result.update(found)
+            remaining = [key for key in remaining if key not in found]
+            missed.append(tier)
+
+        return result
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Удалить несколько значений из всех уровней."""
+        keys = list(keys)
+        for tier in self.tiers.values():
+            await tier.delete_many(keys)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Попадания и промахи по уровням, дополненные собственной статистикой уровня, если она есть."""
+        return {
+            name: {
+                **(tier.stats() if hasattr(tier, "stats") else {}),
+                "hits": self.hits[name],
+                "misses": self.misses[name],
+            }
+            for name, tier in self.tiers.items()
+        }
+
+
+@dataclass
+class CacheEntry:
+    """Значение кэша с мягким сроком годности.
+
+    soft_expire_at (float): unix-время, после которого значение считается устаревшим, но ещё отдаётся клиентам.
+    delta (float): сколько секунд заняло получение значения из хранилища.
+    """
+
+    value: Any
+    soft_expire_at: float
+    delta: float
+
+    def is_stale(self, beta: float = 0) -> bool:
+        """Пора ли обновить значение.
+
+        При beta > 0 используется вероятностное досрочное обновление (XFetch):
+        чем ближе мягкий срок и чем дольше вычисляется значение, тем выше шанс обновить его заранее.
+        Так обновления популярных ключей распределяются во времени, а не происходят одновременно.
+        """
+        now = time.time()
+        if beta > 0:
+            # 1 - random() лежит в (0, 1], поэтому логарифм определён и неположителен.
+            now -= self.delta * beta * math.log(1 - random.random())
+        return now >= self.soft_expire_at
+
 
 class Cache:
     """Класс для работы с кэшэм."""
 
-    def __init__(self, storage: BaseCacheStorage) -> None:
+    def __init__(self, storage: BaseCacheStorage, serializer: CacheSerializer = serializer) -> None:
         self.storage = storage
+        self.serializer = serializer
 
     async def set_cache(self, key: str, value: Any, expire: int | None = None) -> None:
         """Установить кэш для определённого ключа."""
@@ -58,9 +239,111 @@ class Cache:
 
         return cache
 
+    async def set_entry(self, key: str, value: Any, expire: int, stale_ttl: int = 0, delta: float = 0) -> None:
+        """Установить кэш с мягким сроком годности.
 
-async def get_cache_storage():
-    redis = await get_redis()
-    storage = RedisCacheStorage(redis_adapter=redis)
+        value должен состоять из типов, поддерживаемых сериализатором: dict, list, str, int, float, bool, None.
+        Через expire секунд значение становится устаревшим, но ещё stale_ttl секунд хранится в кэше.
+        Если в lifespan включён учёт частоты обращений, expire корректируется по популярности ключа.
+        Срок отрицательных записей (value=None) не увеличивается: частые запросы несуществующего объекта
+        не должны надолго скрывать его появление в индексе.
+        """
+        if frequency.tracker and value is not None:
+            expire = frequency.tracker.adapt_ttl(key, expire)
+        cache = self.serializer.encode([time.time() + expire, delta, value])
+        await self.storage.save_cache(key, cache, expire + stale_ttl)
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Получить кэш с мягким сроком годности по определённому ключу."""
+        if frequency.tracker:
+            frequency.tracker.record(key)
+        cache = await self.storage.retrieve_cache(key)
+        if cache is None:
+            return None
+
+        decoded = self.serializer.decode(cache)
+        if decoded is None:
+            # Значение записано в другом формате - считаем его промахом.
+            return None
 
+        soft_expire_at, delta, value = decoded
+        return CacheEntry(value=value, soft_expire_at=soft_expire_at, delta=delta)
+
+    async def set_many(
+        self, values: Dict[str, Any], expire: int, stale_ttl: int = 0, delta: float = 0
+    ) -> None:
+        """Установить кэш с мягким сроком годности для нескольких ключей сразу.
+
+        Ключи с одинаковым (с учётом популярности) сроком хранения сохраняются одним пакетом.
+        Срок отрицательных записей не корректируется, как и в set_entry.
+        """
+        groups: Dict[int, Dict[str, Any]] = {}
+        for key, value in values.items():
+            key_expire = expire
+            if frequency.tracker and value is not None:
+                key_expire = frequency.tracker.adapt_ttl(key, expire)
+            groups.setdefault(key_expire, {})[key] = value
+
+        now = time.time()
+        for group_expire, group in groups.items():
+            items = {key: self.serializer.encode([now + group_expire, delta, value]) for key, value in group.items()}
+            await self.storage.save_many(items, group_expire + stale_ttl)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """Получить кэш с мягким сроком годности для нескольких ключей сразу.
+
+        Отсутствующие и записанные в другом формате ключи в результат не попадают.
+        """
+        keys = list(keys)
+        if frequency.tracker:
+            for key in keys:
+                frequency.tracker.record(key)
+        entries = {}
+        for key, cache in (await self.storage.retrieve_many(keys)).items():
+            decoded = self.serializer.decode(cache)
+            if decoded is not None:
+                soft_expire_at, delta, value = decoded
+                entries[key] = CacheEntry(value=value, soft_expire_at=soft_expire_at, delta=delta)
+        return entries
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Удалить кэш по нескольким ключам сразу."""
+        await self.storage.delete_many(keys)
+
+
+def build_cache_storage(redis_adapter: Redis) -> BaseCacheStorage:
+    """Собрать хранилище кэша процесса согласно настройкам.
+
+    Порядок уровней: память процесса -> общая память процессов узла -> Redis.
+    """
+    namespace_ttls = {
+        "films": settings.FILM_CACHE_EXPIRE_IN_SECONDS,
+        "persons": settings.PERSON_CACHE_EXPIRE_IN_SECONDS,
+        "genres": settings.GENRE_CACHE_EXPIRE_IN_SECONDS,
+    }
+    tiers: Dict[str, BaseCacheStorage] = {}
+    if settings.MEMORY_CACHE_ENABLED:
+        tiers["memory"] = InMemoryCacheStorage(
+            max_entries=settings.MEMORY_CACHE_MAX_ENTRIES,
+            max_bytes=settings.MEMORY_CACHE_MAX_BYTES,
+            namespace_ttls=namespace_ttls,
+            frequency=frequency.tracker,
+        )
+    if settings.SHARED_CACHE_ENABLED:
+        tiers["shared"] = SharedMemoryCacheStorage(
+            path=settings.SHARED_CACHE_PATH,
+            slots=settings.SHARED_CACHE_SLOTS,
+            slot_size=settings.SHARED_CACHE_SLOT_SIZE,
+            namespace_ttls=namespace_ttls,
+        )
+
+    redis_storage = RedisCacheStorage(redis_adapter=redis_adapter)
+    if not tiers:
+        return redis_storage
+
+    tiers["redis"] = redis_storage
+    return TieredCacheStorage(tiers=tiers)
+
+
+async def get_cache_storage():
     return Cache(storage=storage)
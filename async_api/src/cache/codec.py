@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # необязательная зависимость
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # необязательная зависимость
+    lz4 = None
+
+
+class BaseCacheCodec(ABC):
+    """Абстрактный формат сериализации значений кэша.
+
+    format_id (int) - идентификатор формата, записывается в заголовок значения.
+    """
+
+    format_id: int = 0
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """Сериализовать значение."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Десериализовать значение."""
+
+
+class OrjsonCodec(BaseCacheCodec):
+    format_id = 1
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(BaseCacheCodec):
+    format_id = 2
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class BaseCompressor(ABC):
+    """Абстрактный алгоритм сжатия значений кэша."""
+
+    compression_id: int = 0
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Сжать данные."""
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """Распаковать данные."""
+
+
+class ZstdCompressor(BaseCompressor):
+    compression_id = 1
+
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor()
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Compressor(BaseCompressor):
+    compression_id = 2
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4.frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4.frame.decompress(data)
+
+
+NO_COMPRESSION = 0
+
+
+class CacheSerializer:
+    """Преобразование значений кэша в байты и обратно за один проход.
+
+    Формат значения: [версия][формат][сжатие][данные].
+    Значения с другой версией или неизвестным форматом считаются промахом кэша,
+    поэтому формат можно менять без сброса кэша: старые значения просто перезапишутся.
+    Данные сжимаются, только если их размер не меньше compress_threshold байт.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        codec: BaseCacheCodec,
+        compressor: Optional[BaseCompressor] = None,
+        compress_threshold: int = 1024,
+    ) -> None:
+        self.codec = codec
+        self.compressor = compressor
+        self.compress_threshold = compress_threshold
+        # Читаем все доступные форматы, чтобы переключение настроек не приводило к промахам.
+        self.codecs: Dict[int, BaseCacheCodec] = {codec.format_id: codec for codec in get_available_codecs()}
+        self.compressors: Dict[int, BaseCompressor] = {
+            compressor.compression_id: compressor for compressor in get_available_compressors()
+        }
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.dumps(value)
+        compression_id = NO_COMPRESSION
+        if self.compressor and len(data) >= self.compress_threshold:
+            data = self.compressor.compress(data)
+            compression_id = self.compressor.compression_id
+
+        return bytes((self.VERSION, self.codec.format_id, compression_id)) + data
+
+    def decode(self, data: bytes | str) -> Optional[Any]:
+        """Восстановить значение. Возвращает None, если значение записано в другом формате."""
+        if isinstance(data, str):
+            data = data.encode()
+        if len(data) < 3 or data[0] != self.VERSION:
+            return None
+
+        codec = self.codecs.get(data[1])
+        if codec is None:
+            return None
+
+        payload = data[3:]
+        if data[2] != NO_COMPRESSION:
+            compressor = self.compressors.get(data[2])
+            if compressor is None:
+                return None
+            payload = compressor.decompress(payload)
+
+        return codec.loads(payload)
+
+
+def get_available_codecs() -> List[BaseCacheCodec]:
+    codecs: List[BaseCacheCodec] = [OrjsonCodec()]
+    if msgpack is not None:
+        codecs.append(MsgpackCodec())
+    return codecs
+
+
+def get_available_compressors() -> List[BaseCompressor]:
+    compressors: List[BaseCompressor] = []
+    if zstandard is not None:
+        compressors.append(ZstdCompressor())
+    if lz4 is not None:
+        compressors.append(Lz4Compressor())
+    return compressors
+
+
+def build_serializer(codec_name: str, compression: Optional[str], compress_threshold: int) -> CacheSerializer:
+    """Собрать сериализатор по названиям формата и алгоритма сжатия из настроек."""
+    codecs = {"orjson": OrjsonCodec, "msgpack": MsgpackCodec}
+    if codec_name not in codecs:
+        raise ValueError(f"Unknown cache codec: {codec_name}")
+    if codec_name == "msgpack" and msgpack is None:
+        raise ValueError("Cache codec msgpack requires the msgpack package")
+
+    compressor: Optional[BaseCompressor] = None
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Cache compression zstd requires the zstandard package")
+        compressor = ZstdCompressor()
+    elif compression == "lz4":
+        if lz4 is None:
+            raise ValueError("Cache compression lz4 requires the lz4 package")
+        compressor = Lz4Compressor()
+    elif compression:
+        raise ValueError(f"Unknown cache compression: {compression}")
+
+    return CacheSerializer(codecs[codec_name](), compressor, compress_threshold)
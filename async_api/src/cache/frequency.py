@@ -0,0 +1,139 @@
+import hashlib
+import math
+from array import array
+from typing import Any, Dict, Optional
+
+
+class CountMinSketch:
+    """Приблизительный счётчик частоты строк в фиксированном объёме памяти (count-min sketch).
+
+    Оценка частоты никогда не бывает меньше настоящей, но может быть больше из-за коллизий.
+    width (int) - количество счётчиков в строке, depth (int) - количество строк (независимых хэшей).
+    После sample_size добавлений все счётчики делятся пополам (старение, как в TinyLFU),
+    поэтому оценка отражает недавнюю популярность, а не популярность за всё время работы.
+    """
+
+    def __init__(self, width: int, depth: int, sample_size: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+        self.additions = 0
+        self.resets = 0
+
+    def _positions(self, item: str):
+        # Двойное хэширование, как в фильтре Блума: depth позиций из двух 64-битных хэшей.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.width for i in range(self.depth)]
+
+    def add(self, item: str) -> int:
+        """Учесть обращение и вернуть новую оценку частоты."""
+        positions = self._positions(item)
+        # Консервативное обновление: увеличиваются только минимальные счётчики, что уменьшает переоценку.
+        estimate = min(row[position] for row, position in zip(self.rows, positions)) + 1
+        for row, position in zip(self.rows, positions):
+            if row[position] < estimate:
+                row[position] = estimate
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+        return estimate
+
+    def estimate(self, item: str) -> int:
+        return min(row[position] for row, position in zip(self.rows, self._positions(item)))
+
+    def _reset(self) -> None:
+        for row in self.rows:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value >> 1
+        self.additions //= 2
+        self.resets += 1
+
+
+class FrequencyTracker:
+    """Частота обращений к ключам кэша, по отдельному count-min sketch на пространство имён.
+
+    Пространство имён - префикс ключа до первого ":". Пример: "films" для "films:3:<id>".
+    Используется для адаптивного срока хранения (adapt_ttl) и допуска в L1 по TinyLFU (admit).
+    Для каждого пространства имён запоминаются top_size самых частых ключей - для статистики.
+    """
+
+    def __init__(
+        self, width: int, depth: int, sample_size: int, min_ttl_factor: float, max_ttl_factor: float, top_size: int = 20
+    ) -> None:
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self.min_ttl_factor = min_ttl_factor
+        self.max_ttl_factor = max_ttl_factor
+        self.top_size = top_size
+        self._sketches: Dict[str, CountMinSketch] = {}
+        # namespace -> {key: оценка частоты}
+        self._top: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _get_namespace(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    def record(self, key: str) -> None:
+        """Учесть обращение к ключу."""
+        namespace = self._get_namespace(key)
+        sketch = self._sketches.get(namespace)
+        if sketch is None:
+            sketch = self._sketches[namespace] = CountMinSketch(self.width, self.depth, self.sample_size)
+        resets = sketch.resets
+        estimate = sketch.add(key)
+
+        top = self._top.setdefault(namespace, {})
+        if sketch.resets != resets:
+            # Счётчики состарились - частоты в топе тоже.
+            for top_key in top:
+                top[top_key] >>= 1
+        if key in top or len(top) < self.top_size:
+            top[key] = estimate
+            return
+        coldest = min(top, key=top.get)
+        if top[coldest] < estimate:
+            del top[coldest]
+            top[key] = estimate
+
+    def estimate(self, key: str) -> int:
+        sketch = self._sketches.get(self._get_namespace(key))
+        return sketch.estimate(key) if sketch else 0
+
+    def admit(self, candidate: str, victim: str) -> bool:
+        """Допуск TinyLFU: новый ключ вытесняет старый, только если обращаются к нему чаще.
+
+        Так единичные запросы (например, редкие страницы поиска) не вытесняют популярные ключи.
+        """
+        return self.estimate(candidate) > self.estimate(victim)
+
+    def adapt_ttl(self, key: str, expire: int) -> int:
+        """Срок хранения ключа с учётом его популярности.
+
+        Множитель expire - ближайшая снизу к частоте степень двойки, ограниченная min_ttl_factor и max_ttl_factor:
+        ключ без обращений живёт expire * min_ttl_factor, ключ с 4 и более обращениями - до expire * max_ttl_factor.
+        Множителей немного, поэтому пакетная запись разбивается на небольшое количество групп с одним сроком.
+        """
+        frequency = self.estimate(key)
+        factor = 2 ** math.floor(math.log2(frequency)) if frequency else 0
+        factor = min(max(factor, self.min_ttl_factor), self.max_ttl_factor)
+        return max(1, round(expire * factor))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            namespace: {
+                "additions": sketch.additions,
+                "resets": sketch.resets,
+                "top": sorted(self._top.get(namespace, {}).items(), key=lambda item: item[1], reverse=True),
+            }
+            for namespace, sketch in self._sketches.items()
+        }
+
+
+# Инициализируется в lifespan, если учёт частоты включён в настройках.
+tracker: Optional[FrequencyTracker] = None
@@ -0,0 +1,73 @@
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from redis.asyncio import Redis
+
+# Пространства имён ключей кэша сервисов.
+NAMESPACES = ("films", "persons", "genres")
+
+
+def get_lists_namespace(namespace: str) -> str:
+    """Пространство имён производных ключей: страниц списков и поиска по названию. Пример: "films:lists".
+
+    Имеет собственное поколение, поэтому изменение одного объекта сбрасывает списки,
+    не затрагивая кэш остальных объектов пространства имён.
+    """
+    return f"{namespace}:lists"
+
+
+class CacheGenerations:
+    """Поколения пространств имён кэша.
+
+    Ключи кэша имеют вид "{namespace}:{generation}:{key}".
+    Увеличение поколения делает все старые ключи пространства имён недостижимыми за O(1):
+    без flushall и без обхода ключей через SCAN. Старые значения вытесняются по TTL или LRU.
+    Текущее поколение хранится в Redis по ключу "{namespace}:generation"
+    и кэшируется в процессе на refresh_interval секунд.
+    """
+
+    def __init__(self, redis_adapter: Redis, refresh_interval: float = 1) -> None:
+        self.redis_adapter = redis_adapter
+        self.refresh_interval = refresh_interval
+        # namespace -> (поколение, время следующего чтения из Redis)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+
+    @staticmethod
+    def _get_key(namespace: str) -> str:
+        return f"{namespace}:generation"
+
+    async def get(self, namespace: str) -> int:
+        """Текущее поколение пространства имён."""
+        generation, refresh_at = self._generations.get(namespace, (0, 0))
+        now = time.monotonic()
+        if now >= refresh_at:
+            value = await self.redis_adapter.get(self._get_key(namespace))
+            generation = int(value) if value else 0
+            self._generations[namespace] = (generation, now + self.refresh_interval)
+        return generation
+
+    async def get_many(self, namespaces: Iterable[str]) -> Dict[str, int]:
+        """Поколения нескольких пространств имён, прочитанные из Redis одним запросом в обход кэша процесса."""
+        namespaces = list(namespaces)
+        values = await self.redis_adapter.mget([self._get_key(namespace) for namespace in namespaces])
+        return {namespace: int(value) if value else 0 for namespace, value in zip(namespaces, values)}
+
+    async def bump(self, namespace: str) -> int:
+        """Увеличить поколение пространства имён, сделав недостижимым весь его кэш."""
+        generation = await self.redis_adapter.incr(self._get_key(namespace))
+        self._generations[namespace] = (generation, time.monotonic() + self.refresh_interval)
+        return generation
+
+
+# Инициализируется в lifespan и служебных командах через init_generations.
+generations: Optional[CacheGenerations] = None
+
+
+def init_generations(redis_adapter: Redis, refresh_interval: float = 1) -> CacheGenerations:
+    """Подключить поколения кэша процесса к Redis.
+
+    Без этого ключи строятся с поколением 0 и не совпадают с ключами, которые читают процессы API.
+    """
+    global generations
+    generations = CacheGenerations(redis_adapter, refresh_interval=refresh_interval)
+    return generations
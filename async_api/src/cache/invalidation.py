@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+import orjson
+from cache import bloom, surrogate
+from cache.cache import Cache
+from cache.generation import CacheGenerations, get_lists_namespace
+from redis.asyncio import Redis
+
+# Действия над объектами в сообщении об изменениях.
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+async def publish_changes(
+    redis_adapter: Redis,
+    channel: str,
+    namespace: str,
+    ids: List[str],
+    action: str = UPSERT,
+) -> None:
+    """Сообщить сервисам API об изменении объектов в хранилище.
+
+    Вызывается ETL после записи изменений в elasticsearch.
+    Списки пространства имён сбрасываются здесь, один раз на изменение, а не в каждом процессе API.
+    Сообщение: {"namespace": "films", "ids": ["<id>", ...], "action": "upsert" | "delete"}.
+    """
+    generations = CacheGenerations(redis_adapter)
+    await generations.bump(get_lists_namespace(namespace))
+    message = {"namespace": namespace, "ids": ids, "action": action}
+    await redis_adapter.publish(channel, orjson.dumps(message))
+
+
+class CacheInvalidator:
+    """Подписчик на изменения объектов, удаляющий их из кэша.
+
+    Каждый процесс API подписывается на канал Redis и удаляет изменённые объекты из всех уровней своего кэша.
+    Поэтому сроки хранения в кэше можно делать длинными: изменения видны сразу после публикации.
+    Pub/sub не гарантирует доставку: сообщения, отправленные во время переподключения, теряются,
+    и такие изменения становятся видны по истечении срока хранения, как и без подписки.
+    """
+
+    RECONNECT_INTERVAL_IN_SECONDS = 1
+
+    def __init__(self, redis_adapter: Redis, channel: str, cache: Cache, generations: CacheGenerations) -> None:
+        self.redis_adapter = redis_adapter
+        self.channel = channel
+        self.cache = cache
+        self.generations = generations
+        # Ссылки на задачи сброса кэша nginx, чтобы их не удалил сборщик мусора до завершения.
+        self._purge_tasks = set()
+
+    async def invalidate(self, namespace: str, ids: List[str], action: str = UPSERT) -> None:
+        """Удалить объекты пространства имён из кэша."""
+        current = await self.generations.get(namespace)
+        await self.cache.delete_many([f"{namespace}:{current}:{id_}" for id_ in ids])
+        if action == UPSERT and bloom.id_filters:
+            for id_ in ids:
+                bloom.id_filters.add(namespace, id_)
+        if surrogate.surrogate_keys:
+            surrogate_keys = [namespace, *surrogate.get_surrogate_keys(namespace, ids)]
+            task = asyncio.create_task(surrogate.surrogate_keys.purge(surrogate_keys))
+            self._purge_tasks.add(task)
+            task.add_done_callback(self._on_purge_done)
+        logging.info("cache invalidated: %s %s %s", namespace, action, len(ids))
+
+    def _on_purge_done(self, task: asyncio.Task) -> None:
+        self._purge_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.error("nginx cache purge failed", exc_info=task.exception())
+
+    async def _handle(self, data: bytes) -> None:
+        try:
+            message = orjson.loads(data)
+            namespace, ids = message["namespace"], message["ids"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logging.warning("invalid cache invalidation message: %r", data)
+            return
+        await self.invalidate(namespace, ids, message.get("action", UPSERT))
+
+    async def run(self) -> None:
+        """Слушать канал изменений, переподключаясь при ошибках Redis."""
+        while True:
+            try:
+                async with self.redis_adapter.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            await self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("cache invalidation subscription failed")
+            await asyncio.sleep(self.RECONNECT_INTERVAL_IN_SECONDS)
+
+
+# Инициализируется в lifespan, если подписка включена в настройках.
+invalidator: Optional[CacheInvalidator] = None
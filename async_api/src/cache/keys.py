@@ -0,0 +1,35 @@
+import hashlib
+from urllib.parse import urlencode
+
+# Параметры, вычисляемые из других параметров. В ключ не входят.
+DERIVED_PARAMS = {"sort", "offset"}
+# Параметры, которые ищутся по анализируемым (регистронезависимым) полям elasticsearch.
+ANALYZED_PARAMS = {"query", "genre"}
+# Ключи длиннее этого значения заменяются хэшем.
+MAX_KEY_LENGTH = 200
+
+
+def build_cache_key(path: str, params: dict) -> str:
+    """Построить канонический ключ кэша для списка объектов.
+
+    params - нормализованные параметры запроса из BaseService._get_correct_params,
+    т.е. уже с подставленными значениями по умолчанию.
+    Параметры сортируются по имени, пустые отбрасываются, значения анализируемых полей приводятся к нижнему регистру.
+    Поэтому "?page=1&per_page=50", "?per_page=50&page=1" и запрос без параметров дают один ключ.
+    Слишком длинные ключи заменяются хэшем, чтобы длина ключа была ограничена.
+    """
+    canonical = []
+    for name in sorted(params):
+        value = params[name]
+        if name in DERIVED_PARAMS or value is None or value == "":
+            continue
+        value = str(value)
+        if name in ANALYZED_PARAMS:
+            value = value.strip().lower()
+        canonical.append((name, value))
+
+    key = f"{path.rstrip('/')}?{urlencode(canonical)}"
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        key = f"{path.rstrip('/')}#{digest}"
+    return key
@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache.base import BaseCacheStorage, get_namespace_ttl
+from cache.frequency import FrequencyTracker
+
+
+class InMemoryCacheStorage(BaseCacheStorage):
+    """Кэш в памяти процесса (L1) с вытеснением LRU и TTL.
+
+    Размер ограничен количеством записей (max_entries) и суммарным объёмом значений в байтах (max_bytes).
+    Срок хранения определяется пространством имён ключа - префиксом до первого ":".
+    Пример: ключ "films:<id>" хранится не дольше namespace_ttls["films"] секунд.
+    Если передан frequency, новый ключ в заполненный кэш допускается по TinyLFU:
+    только если к нему обращаются чаще, чем к ключу, который придётся вытеснить.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        namespace_ttls: Dict[str, int] | None = None,
+        frequency: Optional[FrequencyTracker] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_ttls = namespace_ttls or {}
+        self.frequency = frequency
+        # key -> (время истечения, значение, размер значения в байтах)
+        self._data: OrderedDict[str, Tuple[float, Any, int]] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    @staticmethod
+    def _get_size(value: Any) -> int:
+        if isinstance(value, str):
+            return len(value.encode())
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return len(value)
+        return len(str(value).encode())
+
+    def _pop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self.current_bytes -= size
+
+    def _is_full(self, size: int) -> bool:
+        return bool(self._data) and (len(self._data) >= self.max_entries or self.current_bytes + size > self.max_bytes)
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_entries or self.current_bytes > self.max_bytes):
+            # OrderedDict хранит ключи в порядке использования - первым вытесняется самый старый.
+            self._pop(next(iter(self._data)))
+            self.evictions += 1
+
+    async def save_cache(self, key: str, cache: Any, expire: int | None = None) -> None:
+        """Сохранить кэш в хранилище."""
+        ttl = get_namespace_ttl(self.namespace_ttls, key, expire)
+        size = self._get_size(cache)
+        if size > self.max_bytes:
+            return
+
+        if key in self._data:
+            self._pop(key)
+        elif self.frequency and self._is_full(size) and not self.frequency.admit(key, next(iter(self._data))):
+            self.rejections += 1
+            return
+        expires_at = time.monotonic() + ttl if ttl else float("inf")
+        self._put(key, cache, expires_at, size)
+
+    def _put(self, key: str, cache: Any, expires_at: float, size: int) -> None:
+        self._data[key] = (expires_at, cache, size)
+        self.current_bytes += size
+        self._evict()
+
+    async def retrieve_cache(self, key: str) -> Optional[Any]:
+        """Получить кэш из хранилища."""
+        return (await self.retrieve_with_ttl(key))[0]
+
+    async def retrieve_with_ttl(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """Получить кэш и оставшийся срок его хранения в секундах."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, None
+
+        expires_at, cache, _ = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._pop(key)
+            self.misses += 1
+            return None, None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return cache, None if expires_at == float("inf") else expires_at - now
+
+    def export_entries(self, limit: int) -> List[Tuple[str, float, Any]]:
+        """limit недавно использованных записей в порядке от давних к недавним.
+
+        Возвращает (ключ, unix-время истечения, значение): монотонное время не переносится между процессами.
+        """
+        now_monotonic, now = time.monotonic(), time.time()
+        keys = list(self._data)[-limit:]
+        entries = []
+        for key in keys:
+            expires_at, cache, _ = self._data[key]
+            if expires_at > now_monotonic:
+                entries.append((key, expires_at - now_monotonic + now, cache))
+        return entries
+
+    def import_entry(self, key: str, cache: Any, expires_at: float) -> bool:
+        """Восстановить запись, выгруженную export_entries в другом процессе, минуя допуск TinyLFU."""
+        ttl = expires_at - time.time()
+        size = self._get_size(cache)
+        if ttl <= 0 or size > self.max_bytes:
+            return False
+        if key in self._data:
+            self._pop(key)
+        self._put(key, cache, time.monotonic() + ttl, size)
+        return True
+
+    async def delete_cache(self, key: str) -> None:
+        """Удалить кэш из хранилища."""
+        if key in self._data:
+            self._pop(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
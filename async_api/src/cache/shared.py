@@ -0,0 +1,140 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from cache.base import BaseCacheStorage, get_namespace_ttl
+
+# Заголовок слота: seq (счётчик версий seqlock), хэш ключа, время истечения (unix), длина значения.
+SLOT_HEADER = struct.Struct("<QQdI")
+SLOT_SEQ = struct.Struct("<Q")
+
+
+class SharedMemoryCacheStorage(BaseCacheStorage):
+    """Кэш, общий для всех процессов gunicorn на одном узле.
+
+    Хранится в файле, отображённом в память (mmap), например, в /dev/shm.
+    Файл - таблица фиксированного количества слотов одинакового размера.
+    Слот выбирается по хэшу ключа, при коллизии новое значение вытесняет старое.
+
+    Чтение без блокировок (seqlock): писатель делает seq нечётным, записывает слот и делает seq чётным.
+    Читатель повторяет чтение, если seq нечётный или изменился за время чтения.
+    Чётность задаётся явно (seq | 1), поэтому слот, оставшийся нечётным после падения писателя,
+    восстанавливается следующей записью.
+    Писатели разных процессов не мешают друг другу благодаря блокировке байтов слота через fcntl.lockf.
+    Значения больше slot_size - SLOT_HEADER.size байт не кэшируются.
+    Срок хранения ограничивается namespace_ttls так же, как в InMemoryCacheStorage.
+    """
+
+    MAX_READ_ATTEMPTS = 3
+
+    def __init__(self, path: str, slots: int, slot_size: int, namespace_ttls: Dict[str, int] | None = None) -> None:
+        self.path = path
+        self.namespace_ttls = namespace_ttls or {}
+        self.slots = slots
+        self.slot_size = slot_size
+        self.max_value_size = slot_size - SLOT_HEADER.size
+        size = slots * slot_size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            # Первый процесс создаёт файл нужного размера, заполненный нулями (пустые слоты).
+            # Файл с другой геометрией таблицы очищается.
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._mmap = mmap.mmap(self._fd, size)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 зарезервирован за пустым слотом.
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def _get_offset(self, key_hash: int) -> int:
+        return (key_hash % self.slots) * self.slot_size
+
+    def _begin_write(self, offset: int) -> int:
+        """Пометить слот как записываемый (нечётный seq) и вернуть этот seq. Вызывается под блокировкой слота."""
+        seq = SLOT_SEQ.unpack_from(self._mmap, offset)[0] | 1
+        SLOT_HEADER.pack_into(self._mmap, offset, seq, 0, 0, 0)
+        return seq
+
+    def _end_write(self, offset: int, seq: int, key_hash: int, expires_at: float, length: int) -> None:
+        """Записать заголовок слота и последним сделать seq чётным."""
+        SLOT_HEADER.pack_into(self._mmap, offset, seq, key_hash, expires_at, length)
+        SLOT_SEQ.pack_into(self._mmap, offset, seq + 1)
+
+    async def save_cache(self, key: str, cache: Any, expire: int | None = None) -> None:
+        """Сохранить кэш в хранилище."""
+        if isinstance(cache, str):
+            cache = cache.encode()
+        if len(cache) > self.max_value_size:
+            return
+
+        key_hash = self._hash(key)
+        offset = self._get_offset(key_hash)
+        ttl = get_namespace_ttl(self.namespace_ttls, key, expire)
+        expires_at = time.time() + ttl if ttl else float("inf")
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            seq = self._begin_write(offset)
+            data_offset = offset + SLOT_HEADER.size
+            self._mmap[data_offset:data_offset + len(cache)] = cache
+            self._end_write(offset, seq, key_hash, expires_at, len(cache))
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+    async def retrieve_cache(self, key: str) -> Optional[bytes]:
+        """Получить кэш из хранилища."""
+        return (await self.retrieve_with_ttl(key))[0]
+
+    async def retrieve_with_ttl(self, key: str) -> Tuple[Optional[bytes], Optional[float]]:
+        """Получить кэш и оставшийся срок его хранения в секундах."""
+        key_hash = self._hash(key)
+        offset = self._get_offset(key_hash)
+        data_offset = offset + SLOT_HEADER.size
+
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            seq, slot_hash, expires_at, length = SLOT_HEADER.unpack_from(self._mmap, offset)
+            if seq % 2:
+                continue
+            now = time.time()
+            if slot_hash != key_hash or expires_at <= now or length > self.max_value_size:
+                break
+            cache = self._mmap[data_offset:data_offset + length]
+            if SLOT_HEADER.unpack_from(self._mmap, offset)[0] == seq:
+                self.hits += 1
+                return cache, None if expires_at == float("inf") else expires_at - now
+
+        self.misses += 1
+        return None, None
+
+    async def delete_cache(self, key: str) -> None:
+        """Удалить кэш из хранилища. Слот освобождается, только если в нём лежит значение этого ключа."""
+        key_hash = self._hash(key)
+        offset = self._get_offset(key_hash)
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            if SLOT_HEADER.unpack_from(self._mmap, offset)[1] == key_hash:
+                seq = self._begin_write(offset)
+                self._end_write(offset, seq, 0, 0, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    def stats(self) -> Dict[str, int]:
+        return {"slots": self.slots, "slot_size": self.slot_size, "hits": self.hits, "misses": self.misses}
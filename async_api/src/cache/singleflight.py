@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+# Значение get_cached, когда ключа нет в кэше. None означает отрицательную запись: объекта нет в хранилище.
+NOT_CACHED = object()
+
+
+class SingleFlight:
+    """Объединение одновременных запросов по одному ключу внутри процесса.
+
+    Первый вызов по ключу запускает загрузку в отдельной задаче,
+    остальные вызовы с тем же ключом дожидаются её результата.
+    Отмена запроса одного клиента не отменяет загрузку для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+class RedisLockCoalescer:
+    """Объединение запросов по одному ключу между процессами через блокировку в Redis.
+
+    Загрузку выполняет только процесс, захвативший блокировку "lock:<key>".
+    Остальные процессы опрашивают кэш, пока в нём не появится значение,
+    блокировка не будет снята или не истечёт timeout. После этого загружают данные сами.
+    get_cached возвращает NOT_CACHED, если ключа нет в кэше. Отрицательная запись (None) тоже результат:
+    её отдают всем ожидающим, иначе каждый процесс повторил бы запрос несуществующего объекта.
+    """
+
+    def __init__(self, redis_adapter: Redis, timeout_ms: int, poll_interval_ms: int) -> None:
+        self.redis_adapter = redis_adapter
+        self.timeout = timeout_ms / 1000
+        self.poll_interval = poll_interval_ms / 1000
+
+    async def run(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        get_cached: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        lock = self.redis_adapter.lock(f"lock:{key}", timeout=self.timeout)
+        if await lock.acquire(blocking=False):
+            try:
+                return await load()
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    # Блокировка истекла раньше, чем завершилась загрузка.
+                    logging.warning("lock for %s expired before release", key)
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await get_cached()
+            if cached is not NOT_CACHED:
+                return cached
+            if not await lock.locked():
+                break
+
+        return await load()
+
+
+single_flight = SingleFlight()
+# Инициализируется в lifespan, если включён режим распределённой блокировки.
+lock_coalescer: Optional[RedisLockCoalescer] = None
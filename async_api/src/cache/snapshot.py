@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Tuple
+
+import orjson
+from cache.generation import NAMESPACES, CacheGenerations, get_lists_namespace
+from cache.memory import InMemoryCacheStorage
+
+# Формат файла: MAGIC, длина заголовка, заголовок (JSON), количество записей,
+# затем записи: ENTRY_HEADER, ключ (utf-8), значение.
+MAGIC = b"ACS2"
+HEADER_SIZE = struct.Struct("<I")
+COUNT = struct.Struct("<I")
+# Время истечения (unix), длина ключа, длина значения.
+ENTRY_HEADER = struct.Struct("<dHI")
+# Пространства имён, поколения которых записываются в заголовок снимка.
+GENERATION_NAMESPACES = (*NAMESPACES, *(get_lists_namespace(namespace) for namespace in NAMESPACES))
+
+
+async def get_generations(generations: CacheGenerations) -> Dict[str, int]:
+    """Текущие поколения пространств имён для заголовка снимка или сравнения с ним.
+
+    Поколение списков увеличивается при каждой публикации изменений (см. publish_changes),
+    поэтому оно отмечает и удаление отдельных объектов, ключи которых от поколения не зависят.
+    """
+    return await generations.get_many(GENERATION_NAMESPACES)
+
+
+def _get_changed_namespaces(saved: Dict[str, int], current: Dict[str, int]) -> set:
+    return {
+        namespace
+        for namespace in NAMESPACES
+        if any(saved.get(name) != current.get(name) for name in (namespace, get_lists_namespace(namespace)))
+    }
+
+
+def dump_snapshot(entries: List[Tuple[str, float, Any]], path: str, generations: Dict[str, int]) -> int:
+    """Записать записи кэша в файл и вернуть их количество.
+
+    generations - поколения пространств имён, прочитанные до выгрузки записей (см. get_generations).
+    Файл сначала пишется во временный и затем атомарно переименовывается,
+    поэтому процессы, читающие снимок, никогда не видят его частично записанным.
+    Сохраняются только значения-байты - в таком виде их хранит Cache.
+    """
+    entries = [(key.encode(), expires_at, cache) for key, expires_at, cache in entries if isinstance(cache, bytes)]
+    header = orjson.dumps({"generations": generations})
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as snapshot:
+        snapshot.write(MAGIC)
+        snapshot.write(HEADER_SIZE.pack(len(header)))
+        snapshot.write(header)
+        snapshot.write(COUNT.pack(len(entries)))
+        for key, expires_at, cache in entries:
+            snapshot.write(ENTRY_HEADER.pack(expires_at, len(key), len(cache)))
+            snapshot.write(key)
+            snapshot.write(cache)
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+def load_snapshot(storage: InMemoryCacheStorage, path: str, generations: Dict[str, int]) -> int:
+    """Загрузить снимок в кэш и вернуть количество восстановленных записей.
+
+    generations - текущие поколения пространств имён (см. get_generations).
+    Записи пространств имён, изменившихся после сохранения снимка, не загружаются:
+    среди них могут быть удалённые или изменённые объекты.
+    Файл читается через mmap без предварительного чтения целиком в память.
+    Записи с истёкшим сроком пропускаются, повреждённый или отсутствующий файл игнорируется.
+    """
+    try:
+        with open(path, "rb") as snapshot:
+            if os.fstat(snapshot.fileno()).st_size < len(MAGIC) + HEADER_SIZE.size:
+                return 0
+            with mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(MAGIC)] != MAGIC:
+                    logging.warning("cache snapshot %s has unknown format", path)
+                    return 0
+                offset = len(MAGIC)
+                (header_size,) = HEADER_SIZE.unpack_from(data, offset)
+                offset += HEADER_SIZE.size
+                header = orjson.loads(data[offset:offset + header_size])
+                offset += header_size
+                changed = _get_changed_namespaces(header["generations"], generations)
+                if changed:
+                    logging.info("cache snapshot %s: namespaces changed since dump: %s", path, sorted(changed))
+
+                (count,) = COUNT.unpack_from(data, offset)
+                offset += COUNT.size
+                loaded = 0
+                for _ in range(count):
+                    expires_at, key_size, cache_size = ENTRY_HEADER.unpack_from(data, offset)
+                    offset += ENTRY_HEADER.size
+                    key = data[offset:offset + key_size].decode()
+                    offset += key_size
+                    cache = data[offset:offset + cache_size]
+                    offset += cache_size
+                    if key.split(":", 1)[0] in changed:
+                        continue
+                    if storage.import_entry(key, cache, expires_at):
+                        loaded += 1
+                return loaded
+    except FileNotFoundError:
+        return 0
+    except (struct.error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        logging.warning("cache snapshot %s is corrupted", path)
+        return 0
+
+
+async def save_snapshot(
+    storage: InMemoryCacheStorage, path: str, max_entries: int, generations: CacheGenerations
+) -> None:
+    """Сохранить снимок L1-кэша, не блокируя цикл событий записью на диск."""
+    try:
+        # Поколения читаются до выгрузки записей: если изменение опубликуют между ними,
+        # снимок получит старое поколение и изменённое пространство имён не загрузится.
+        current = await get_generations(generations)
+    except Exception:
+        logging.exception("cache snapshot was not saved: cache generations are unavailable")
+        return
+    entries = storage.export_entries(max_entries)
+    try:
+        count = await asyncio.to_thread(dump_snapshot, entries, path, current)
+    except OSError:
+        logging.exception("cache snapshot was not saved")
+        return
+    logging.info("cache snapshot saved: %s entries", count)
+
+
+async def run(
+    storage: InMemoryCacheStorage, path: str, interval: float, max_entries: int, generations: CacheGenerations
+) -> None:
+    """Сохранять снимок L1-кэша каждые interval секунд."""
+    while True:
+        await asyncio.sleep(interval)
+        await save_snapshot(storage, path, max_entries, generations)
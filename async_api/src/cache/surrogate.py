@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Iterable, List, Optional
+
+import httpx
+from redis.asyncio import Redis
+
+# Заголовок запроса, по которому nginx идёт в API мимо своего кэша и сохраняет новый ответ (proxy_cache_bypass).
+PURGE_HEADER = "X-Cache-Purge"
+# nginx хранит отдельный вариант ответа для каждой нормализованной кодировки (см. readonly-async-api.conf).
+ACCEPT_ENCODINGS = ("identity", "gzip", "br")
+
+
+def get_surrogate_keys(namespace: str, ids: Iterable[str]) -> List[str]:
+    """Surrogate keys объектов. Пример: ["films:<id>", ...].
+
+    Ответ со списком помечается ещё и ключом пространства имён (например, "films"),
+    т.к. состав и порядок списка меняются при изменении любого объекта.
+    """
+    return [f"{namespace}:{id_}" for id_ in ids]
+
+
+class SurrogateKeys:
+    """Точечный сброс ответов, закэшированных nginx, по surrogate keys.
+
+    Открытый nginx не умеет удалять записи кэша по тегу, поэтому API само хранит в Redis,
+    какие URL помечены каждым ключом: множество "surrogate:{key}".
+    При изменении объектов URL извлекаются из множеств через SPOP - каждый URL обрабатывает ровно один процесс API, -
+    и запрашиваются у nginx с заголовком PURGE_HEADER. nginx идёт за ними в API мимо кэша и заменяет запись свежим ответом.
+    """
+
+    def __init__(self, redis_adapter: Redis, purge_url: str, expire: int, delay: float) -> None:
+        self.redis_adapter = redis_adapter
+        self.purge_url = purge_url.rstrip("/")
+        # Множества живут не меньше, чем ответы в кэше nginx.
+        self.expire = expire
+        # Пауза перед сбросом, чтобы все процессы API успели увидеть новое поколение кэша
+        # и nginx не сохранил устаревший ответ другого процесса.
+        self.delay = delay
+        self.http_client = httpx.AsyncClient(timeout=5)
+
+    @staticmethod
+    def _get_key(surrogate_key: str) -> str:
+        return f"surrogate:{surrogate_key}"
+
+    async def register(self, url: str, surrogate_keys: Iterable[str]) -> None:
+        """Запомнить, что ответ по url помечен surrogate_keys."""
+        async with self.redis_adapter.pipeline(transaction=False) as pipe:
+            for surrogate_key in surrogate_keys:
+                pipe.sadd(self._get_key(surrogate_key), url)
+                pipe.expire(self._get_key(surrogate_key), self.expire)
+            await pipe.execute()
+
+    async def _refresh(self, url: str) -> None:
+        for encoding in ACCEPT_ENCODINGS:
+            try:
+                await self.http_client.get(
+                    f"{self.purge_url}{url}", headers={PURGE_HEADER: "1", "Accept-Encoding": encoding}
+                )
+            except httpx.HTTPError as error:
+                logging.warning("nginx cache for %s (%s) was not purged: %r", url, encoding, error)
+
+    async def purge(self, surrogate_keys: Iterable[str], batch_size: int = 100) -> int:
+        """Обновить в кэше nginx все ответы, помеченные surrogate_keys, и вернуть их количество."""
+        await asyncio.sleep(self.delay)
+        # Ответ может быть помечен несколькими ключами - обновляем его один раз.
+        urls = set()
+        for surrogate_key in surrogate_keys:
+            while popped := await self.redis_adapter.spop(self._get_key(surrogate_key), batch_size):
+                urls.update(url.decode() for url in popped)
+
+        urls = list(urls)
+        for i in range(0, len(urls), batch_size):
+            await asyncio.gather(*(self._refresh(url) for url in urls[i:i + batch_size]))
+        return len(urls)
+
+    async def close(self) -> None:
+        await self.http_client.aclose()
+
+
+# Инициализируется в lifespan, если в настройках указан адрес nginx для сброса кэша.
+surrogate_keys: Optional[SurrogateKeys] = None
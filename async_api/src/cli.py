@@ -0,0 +1,96 @@
+"""Служебные команды сервиса.
+
+Запуск из директории src:
+    python cli.py invalidate films persons
+    python cli.py publish films <id> <id> --action delete
+    python cli.py warmup --manifest /var/log/nginx/access.log
+"""
+import argparse
+import asyncio
+from typing import List
+
+from cache.cache import Cache, build_cache_storage
+from cache.generation import NAMESPACES, CacheGenerations, get_lists_namespace, init_generations
+from cache.invalidation import DELETE, UPSERT, publish_changes
+from core.config import settings
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from services.warmup import CacheWarmer, load_manifest
+
+
+async def invalidate(namespaces: List[str]) -> None:
+    """Сбросить кэш пространств имён, увеличив их поколение."""
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    try:
+        generations = CacheGenerations(redis)
+        for namespace in namespaces:
+            current = await generations.bump(namespace)
+            await generations.bump(get_lists_namespace(namespace))
+            print(f"{namespace}: cache generation {current}")
+    finally:
+        await redis.close()
+
+
+async def publish(namespace: str, ids: List[str], action: str) -> None:
+    """Опубликовать изменение объектов так же, как это делает ETL."""
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    try:
+        await publish_changes(redis, settings.CACHE_INVALIDATION_CHANNEL, namespace, ids, action)
+        print(f"{namespace}: {action} {len(ids)} ids published")
+    finally:
+        await redis.close()
+
+
+async def warmup(manifest_path: str | None) -> None:
+    """Прогреть общий кэш (Redis) по манифесту, например, после перезапуска Redis."""
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    elastic = AsyncElasticsearch(
+        hosts=[f"{settings.ELASTIC_SCHEMA}{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}"]
+    )
+    try:
+        # Ключи строятся с текущими поколениями из Redis, иначе прогретый кэш не будет прочитан API.
+        init_generations(redis, refresh_interval=settings.CACHE_GENERATION_REFRESH_IN_SECONDS)
+        warmer = CacheWarmer(
+            Cache(storage=build_cache_storage(redis)),
+            elastic,
+            concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+            batch_size=settings.CACHE_WARMUP_BATCH_SIZE,
+        )
+        manifest = load_manifest(manifest_path, settings.CACHE_WARMUP_PAGES, settings.CACHE_WARMUP_TOP)
+        loaded = await warmer.warm_up(manifest)
+        print(f"cache warmed up: {loaded} objects")
+    finally:
+        await redis.close()
+        await elastic.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Служебные команды async API.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    invalidate_parser = subparsers.add_parser(
+        "invalidate", help="Сбросить кэш пространств имён, например, после переиндексации."
+    )
+    invalidate_parser.add_argument("namespaces", nargs="+", choices=NAMESPACES)
+
+    publish_parser = subparsers.add_parser(
+        "publish", help="Сообщить сервисам API об изменении объектов, удалив их из кэша."
+    )
+    publish_parser.add_argument("namespace", choices=NAMESPACES)
+    publish_parser.add_argument("ids", nargs="+")
+    publish_parser.add_argument("--action", choices=(UPSERT, DELETE), default=UPSERT)
+
+    warmup_parser = subparsers.add_parser("warmup", help="Прогреть кэш по манифесту или access-логу nginx.")
+    warmup_parser.add_argument("--manifest", default=settings.CACHE_WARMUP_MANIFEST)
+
+    args = parser.parse_args()
+    if args.command == "invalidate":
+        asyncio.run(invalidate(args.namespaces))
+    elif args.command == "publish":
+        asyncio.run(publish(args.namespace, args.ids, args.action))
+    elif args.command == "warmup":
+        asyncio.run(warmup(args.manifest))
+
+
+if __name__ == "__main__":
+    main()
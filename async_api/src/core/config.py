@@ -30,6 +30,107 @@ class Settings(BaseSettings):
     PERSON_CACHE_EXPIRE_IN_SECONDS: int
     GENRE_CACHE_EXPIRE_IN_SECONDS: int
 
+    # Настройки кэша в памяти процесса (L1), расположенного перед Redis
+    MEMORY_CACHE_ENABLED: bool = True
+    MEMORY_CACHE_MAX_ENTRIES: int = 10_000
+    MEMORY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Снимок L1-кэша на диске: сохраняется каждые SNAPSHOT_INTERVAL секунд (0 - только при остановке)
+    # и загружается при запуске процесса, чтобы перезапуск воркера не начинался с холодного кэша. Пусто - отключено
+    # Записи пространств имён, изменившихся после сохранения снимка (по поколениям кэша), не загружаются
+    MEMORY_CACHE_SNAPSHOT_PATH: str | None = None
+    MEMORY_CACHE_SNAPSHOT_INTERVAL_IN_SECONDS: float = 300
+    MEMORY_CACHE_SNAPSHOT_MAX_ENTRIES: int = 5000
+
+    # Настройки кэша в общей памяти процессов gunicorn одного узла, расположенного между L1 и Redis.
+    # Размер файла: SHARED_CACHE_SLOTS * SHARED_CACHE_SLOT_SIZE байт.
+    SHARED_CACHE_ENABLED: bool = False
+    SHARED_CACHE_PATH: str = "/dev/shm/async_api_cache"
+    SHARED_CACHE_SLOTS: int = 8192
+    SHARED_CACHE_SLOT_SIZE: int = 4096
+
+    # Объединение одновременных промахов кэша между процессами через блокировку в Redis
+    CACHE_DISTRIBUTED_LOCK: bool = False
+    CACHE_LOCK_TIMEOUT_IN_MS: int = 5000
+    CACHE_LOCK_POLL_INTERVAL_IN_MS: int = 50
+
+    # Сколько секунд устаревшее значение отдаётся из кэша, пока оно обновляется в фоне
+    CACHE_STALE_TTL_IN_SECONDS: int = 60
+    # Коэффициент вероятностного досрочного обновления кэша (XFetch). 0 - обновлять только после истечения срока
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
+    # Формат значений кэша: "orjson" или "msgpack"
+    CACHE_CODEC: str = "orjson"
+    # Сжатие значений кэша: "zstd", "lz4" или пусто
+    CACHE_COMPRESSION: str | None = None
+    CACHE_COMPRESSION_THRESHOLD_IN_BYTES: int = 1024
+
+    # Как часто процесс перечитывает поколения пространств имён кэша из Redis
+    CACHE_GENERATION_REFRESH_IN_SECONDS: float = 1
+
+    # Подписка на изменения объектов, публикуемые ETL: изменённые объекты удаляются из всех уровней кэша
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidation"
+
+    # Сжатие кэшированных ответов API: выполняется один раз при промахе, варианты хранятся вместе с ответом
+    RESPONSE_COMPRESSION_MIN_SIZE_IN_BYTES: int = 1000
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 5
+
+    # Сброс ответов, закэшированных nginx, по surrogate keys при изменении объектов.
+    # PURGE_URL - адрес nginx, через который API запрашивает ответы мимо кэша nginx. Пусто - отключено.
+    # SURROGATE_KEYS_EXPIRE должен быть не меньше срока хранения ответов в nginx
+    NGINX_CACHE_PURGE_URL: str | None = None
+    SURROGATE_KEYS_EXPIRE_IN_SECONDS: int = 3600
+    SURROGATE_PURGE_DELAY_IN_SECONDS: float = 2
+
+    # Учёт частоты обращений к ключам кэша (count-min sketch на пространство имён):
+    # адаптивный срок хранения от expire * MIN_FACTOR для редких ключей до expire * MAX_FACTOR для популярных
+    # и допуск новых ключей в L1 по TinyLFU
+    CACHE_FREQUENCY_ENABLED: bool = True
+    CACHE_FREQUENCY_SKETCH_WIDTH: int = 4096
+    CACHE_FREQUENCY_SKETCH_DEPTH: int = 4
+    CACHE_FREQUENCY_SAMPLE_SIZE: int = 40_960
+    CACHE_ADAPTIVE_TTL_MIN_FACTOR: float = 0.5
+    CACHE_ADAPTIVE_TTL_MAX_FACTOR: float = 4
+
+    # Прогрев кэша при запуске. Сервис начинает принимать запросы после прогрева или по истечении TIME_BUDGET.
+    # MANIFEST - JSON-манифест или access-лог nginx (см. services/warmup.py), без него прогреваются
+    # все жанры и первые PAGES страниц фильмов в сортировках по рейтингу
+    CACHE_WARMUP_ENABLED: bool = True
+    CACHE_WARMUP_MANIFEST: str | None = None
+    CACHE_WARMUP_PAGES: int = 3
+    CACHE_WARMUP_TOP: int = 1000
+    CACHE_WARMUP_CONCURRENCY: int = 4
+    CACHE_WARMUP_BATCH_SIZE: int = 100
+    CACHE_WARMUP_TIME_BUDGET_IN_SECONDS: float = 10
+
+    # Point in time elasticsearch для курсорной пагинации (см. db/pit.py).
+    # PIT открывается заново не реже раза в REFRESH секунд, чтобы в страницы попадали новые документы
+    ELASTIC_PIT_ENABLED: bool = True
+    ELASTIC_PIT_KEEP_ALIVE: str = "5m"
+    ELASTIC_PIT_REFRESH_IN_SECONDS: int = 60
+
+    # Объединение одновременных поисковых запросов в один _msearch (см. db/msearch.py):
+    # запросы копятся WINDOW миллисекунд или до MAX_BATCH штук
+    ELASTIC_MSEARCH_ENABLED: bool = True
+    ELASTIC_MSEARCH_WINDOW_IN_MS: float = 2
+    ELASTIC_MSEARCH_MAX_BATCH: int = 32
+
+    # Справочник жанров в памяти процесса (см. services/genre_registry.py).
+    # Перезагружается после публикации изменений жанров и не реже раза в REFRESH секунд
+    GENRE_REGISTRY_ENABLED: bool = True
+    GENRE_REGISTRY_REFRESH_IN_SECONDS: int = 300
+
+    # Срок хранения в кэше отметки об отсутствии объекта в хранилище
+    NEGATIVE_CACHE_EXPIRE_IN_SECONDS: int = 30
+
+    # Фильтр Блума существующих id: 404 для неизвестных id без запросов в Redis и elasticsearch.
+    # Новые id становятся доступными после перестроения фильтра.
+    BLOOM_FILTER_ENABLED: bool = False
+    BLOOM_FILTER_REFRESH_IN_SECONDS: int = 600
+    BLOOM_FILTER_ERROR_RATE: float = 0.01
+
     LOG_LEVEL: str
 
     class Config:
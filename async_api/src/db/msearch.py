@@ -0,0 +1,158 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from elastic_transport import ObjectApiResponse
+from elasticsearch import ApiError, AsyncElasticsearch
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
+
+# Параметры search, которые переносятся в тело запроса _msearch. Запросы с другими параметрами отправляются как есть.
+BODY_PARAMS = {
+    "query": "query",
+    "size": "size",
+    "from_": "from",
+    "sort": "sort",
+    "search_after": "search_after",
+    "pit": "pit",
+}
+
+
+class SearchBatcher:
+    """Объединение одновременных поисковых запросов в один _msearch.
+
+    Запросы копятся window_ms миллисекунд или до max_batch штук и отправляются одним HTTP-запросом,
+    каждый ответ возвращается своему ожидающему запросу, ошибка отдельного поиска - только ему.
+    Одиночный запрос отправляется обычным search.
+    Окно добавляет до window_ms к времени ответа, но под нагрузкой сокращает число HTTP-запросов в elasticsearch.
+    """
+
+    def __init__(self, elastic: AsyncElasticsearch, window_ms: float, max_batch: int) -> None:
+        self.elastic = elastic
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        # (индекс, параметры search, future, время постановки в очередь)
+        self._pending: List[Tuple[Optional[str], dict, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Ссылки на задачи отправки, чтобы их не удалил сборщик мусора до завершения.
+        self._tasks = set()
+        self.batches = 0
+        self.searches = 0
+        self.max_batch_size = 0
+        # Размер пакета (степень двойки, округление вверх) -> количество пакетов.
+        self.batch_sizes: Dict[int, int] = {}
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @staticmethod
+    def _to_msearch(index: Optional[str], kwargs: Dict[str, Any]) -> Optional[Tuple[dict, dict]]:
+        """Заголовок и тело _msearch для параметров search. None - параметры не поддерживаются."""
+        body = {}
+        for name, value in kwargs.items():
+            if value is None:
+                continue
+            if name == "source_includes":
+                body["_source"] = {"includes": list(value)}
+            elif name in BODY_PARAMS:
+                body[BODY_PARAMS[name]] = value
+            else:
+                return None
+        # Поиск по PIT выполняется без индекса.
+        header = {"index": index} if index else {}
+        return header, body
+
+    async def search(self, index: Optional[str] = None, **kwargs: Any) -> ObjectApiResponse:
+        """Аналог AsyncElasticsearch.search, выполняемый в составе пакета."""
+        if self._to_msearch(index, kwargs) is None:
+            return await self.elastic.search(index=index, **kwargs)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((index, kwargs, future, time.monotonic()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _record(self, batch: List[Tuple[Optional[str], dict, asyncio.Future, float]]) -> None:
+        now = time.monotonic()
+        size = len(batch)
+        self.batches += 1
+        self.searches += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        bucket = 1 << (size - 1).bit_length()
+        self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+        for *_, queued_at in batch:
+            self.wait_time += now - queued_at
+            self.max_wait_time = max(self.max_wait_time, now - queued_at)
+
+    async def _send(self, batch: List[Tuple[Optional[str], dict, asyncio.Future, float]]) -> None:
+        self._record(batch)
+        try:
+            if len(batch) == 1:
+                index, kwargs, *_ = batch[0]
+                results = [await self.elastic.search(index=index, **kwargs)]
+            else:
+                searches = []
+                for index, kwargs, *_ in batch:
+                    searches.extend(self._to_msearch(index, kwargs))
+                response = await self.elastic.msearch(searches=searches)
+                results = [self._to_result(item, response.meta) for item in response.body["responses"]]
+        except Exception as error:
+            for *_, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (*_, future, _), result in zip(batch, results):
+            if future.done():
+                # Ожидавший запрос отменён.
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _to_result(item: dict, meta: Any) -> ObjectApiResponse | ApiError:
+        status = item.get("status", 200)
+        meta = dataclasses.replace(meta, status=status)
+        if "error" in item:
+            error = item["error"]
+            message = error.get("type", "search error") if isinstance(error, dict) else str(error)
+            return HTTP_EXCEPTIONS.get(status, ApiError)(message=message, meta=meta, body=item)
+        return ObjectApiResponse(body=item, meta=meta)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "searches": self.searches,
+            "avg_batch_size": round(self.searches / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.max_batch_size,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "avg_wait_ms": round(self.wait_time / self.searches * 1000, 3) if self.searches else 0,
+            "max_wait_ms": round(self.max_wait_time * 1000, 3),
+        }
+
+    async def close(self) -> None:
+        """Отправить накопленные запросы и дождаться ответов."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logging.info("msearch batcher closed: %s", self.stats())
+
+
+# Инициализируется в lifespan, если объединение запросов включено в настройках.
+batcher: Optional[SearchBatcher] = None
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch, ApiError
+
+
+class PointInTimes:
+    """Point in time (PIT) индексов elasticsearch для постраничного обхода через search_after.
+
+    PIT фиксирует состояние индекса, поэтому соседние страницы курсора согласованы между собой.
+    На индекс открыт один PIT, общий для всех запросов процесса. Курсор его id не содержит,
+    поэтому одинаковые курсоры дают одинаковые ключи кэша.
+    PIT открывается заново раз в refresh_interval секунд и при смене версии (поколения списков кэша),
+    иначе изменения, о которых уже знает кэш, не попали бы в новые страницы.
+    Предыдущий PIT не закрывается - запросы могут ещё его использовать - и истекает сам через keep_alive.
+    """
+
+    def __init__(self, elastic: AsyncElasticsearch, keep_alive: str, refresh_interval: float) -> None:
+        self.elastic = elastic
+        self.keep_alive = keep_alive
+        self.refresh_interval = refresh_interval
+        # Индекс -> (версия, id PIT, время открытия по time.monotonic()).
+        self._pits: Dict[str, Tuple[str, str, float]] = {}
+        self._lock = asyncio.Lock()
+
+    def _get_actual(self, index: str, version: str) -> Optional[str]:
+        pit = self._pits.get(index)
+        if pit and pit[0] == version and time.monotonic() - pit[2] < self.refresh_interval:
+            return pit[1]
+        return None
+
+    async def get(self, index: str, version: str) -> str:
+        """id актуального PIT индекса. Одновременные запросы открывают не больше одного PIT."""
+        pit_id = self._get_actual(index, version)
+        if pit_id:
+            return pit_id
+
+        async with self._lock:
+            pit_id = self._get_actual(index, version)
+            if not pit_id:
+                response = await self.elastic.open_point_in_time(index=index, keep_alive=self.keep_alive)
+                pit_id = response["id"]
+                self._pits[index] = (version, pit_id, time.monotonic())
+        return pit_id
+
+    def discard(self, index: str, pit_id: str) -> None:
+        """Забыть истёкший PIT, чтобы следующий запрос открыл новый."""
+        pit = self._pits.get(index)
+        if pit and pit[1] == pit_id:
+            del self._pits[index]
+
+    async def close(self) -> None:
+        for _, pit_id, _ in self._pits.values():
+            with suppress(ApiError):
+                await self.elastic.close_point_in_time(id=pit_id)
+        logging.info("point in times closed: %s", len(self._pits))
+        self._pits.clear()
+
+
+# Инициализируется в lifespan, если PIT включён в настройках. Без него курсор работает через search_after по индексу.
+point_in_times: Optional[PointInTimes] = None
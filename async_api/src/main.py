@@ -1,23 +1,157 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 
-from api.v1 import films, persons, genres
+from api.v1 import cache as cache_api, films, persons, genres
+from cache import bloom, cache, frequency, generation, invalidation, singleflight, snapshot, surrogate
 from core.config import settings
-from db import elastic, redis
+from db import elastic, msearch, pit, redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
+from services import genre_registry
+from services.warmup import CacheWarmer, load_manifest, warm_up_once
 
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(application: FastAPI):
     # TODO наличие соединения не проверяется
     redis.redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    if settings.CACHE_FREQUENCY_ENABLED:
+        frequency.tracker = frequency.FrequencyTracker(
+            width=settings.CACHE_FREQUENCY_SKETCH_WIDTH,
+            depth=settings.CACHE_FREQUENCY_SKETCH_DEPTH,
+            sample_size=settings.CACHE_FREQUENCY_SAMPLE_SIZE,
+            min_ttl_factor=settings.CACHE_ADAPTIVE_TTL_MIN_FACTOR,
+            max_ttl_factor=settings.CACHE_ADAPTIVE_TTL_MAX_FACTOR,
+        )
+    cache.storage = cache.build_cache_storage(redis.redis)
+    memory_cache = cache.storage.tiers.get("memory") if isinstance(cache.storage, cache.TieredCacheStorage) else None
+    generation.init_generations(redis.redis, refresh_interval=settings.CACHE_GENERATION_REFRESH_IN_SECONDS)
+    snapshot_task = None
+    if memory_cache and settings.MEMORY_CACHE_SNAPSHOT_PATH:
+        try:
+            current_generations = await snapshot.get_generations(generation.generations)
+        except Exception:
+            # Без поколений нельзя понять, какие записи снимка устарели, поэтому снимок не загружается.
+            logging.exception("cache snapshot was not loaded: cache generations are unavailable")
+        else:
+            loaded = snapshot.load_snapshot(memory_cache, settings.MEMORY_CACHE_SNAPSHOT_PATH, current_generations)
+            logging.info("cache snapshot loaded: %s entries", loaded)
+        if settings.MEMORY_CACHE_SNAPSHOT_INTERVAL_IN_SECONDS:
+            snapshot_task = asyncio.create_task(
+                snapshot.run(
+                    memory_cache,
+                    settings.MEMORY_CACHE_SNAPSHOT_PATH,
+                    settings.MEMORY_CACHE_SNAPSHOT_INTERVAL_IN_SECONDS,
+                    settings.MEMORY_CACHE_SNAPSHOT_MAX_ENTRIES,
+                    generation.generations,
+                )
+            )
+    if settings.CACHE_DISTRIBUTED_LOCK:
+        singleflight.lock_coalescer = singleflight.RedisLockCoalescer(
+            redis.redis,
+            timeout_ms=settings.CACHE_LOCK_TIMEOUT_IN_MS,
+            poll_interval_ms=settings.CACHE_LOCK_POLL_INTERVAL_IN_MS,
+        )
     elastic.es = AsyncElasticsearch(hosts=[f"{settings.ELASTIC_SCHEMA}{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}"])
     print("redis connection successful")
     print("elastic connection successful")
+    if settings.ELASTIC_MSEARCH_ENABLED:
+        msearch.batcher = msearch.SearchBatcher(
+            elastic.es,
+            window_ms=settings.ELASTIC_MSEARCH_WINDOW_IN_MS,
+            max_batch=settings.ELASTIC_MSEARCH_MAX_BATCH,
+        )
+    if settings.ELASTIC_PIT_ENABLED:
+        pit.point_in_times = pit.PointInTimes(
+            elastic.es,
+            keep_alive=settings.ELASTIC_PIT_KEEP_ALIVE,
+            refresh_interval=settings.ELASTIC_PIT_REFRESH_IN_SECONDS,
+        )
+    genre_registry_task = None
+    if settings.GENRE_REGISTRY_ENABLED:
+        genre_registry.registry = genre_registry.GenreRegistry(elastic.es)
+        try:
+            await genre_registry.registry.load()
+        except Exception:
+            # Пока справочник не загружен, жанры ищутся через кэш и elasticsearch.
+            logging.exception("genre registry was not loaded")
+        genre_registry_task = asyncio.create_task(
+            genre_registry.registry.run(
+                check_interval=settings.CACHE_GENERATION_REFRESH_IN_SECONDS,
+                refresh_interval=settings.GENRE_REGISTRY_REFRESH_IN_SECONDS,
+            )
+        )
+    bloom_task = None
+    if settings.BLOOM_FILTER_ENABLED:
+        bloom.id_filters = bloom.IdFilters(
+            elastic.es,
+            indexes={"films": "movies", "persons": "persons", "genres": "genres"},
+            error_rate=settings.BLOOM_FILTER_ERROR_RATE,
+        )
+        bloom_task = asyncio.create_task(bloom.id_filters.run(settings.BLOOM_FILTER_REFRESH_IN_SECONDS))
+    if settings.NGINX_CACHE_PURGE_URL:
+        surrogate.surrogate_keys = surrogate.SurrogateKeys(
+            redis.redis,
+            purge_url=settings.NGINX_CACHE_PURGE_URL,
+            expire=settings.SURROGATE_KEYS_EXPIRE_IN_SECONDS,
+            # Все процессы должны успеть перечитать поколения кэша, прежде чем nginx запросит свежий ответ.
+            delay=max(settings.SURROGATE_PURGE_DELAY_IN_SECONDS, settings.CACHE_GENERATION_REFRESH_IN_SECONDS),
+        )
+    invalidation_task = None
+    if settings.CACHE_INVALIDATION_ENABLED:
+        invalidation.invalidator = invalidation.CacheInvalidator(
+            redis.redis,
+            channel=settings.CACHE_INVALIDATION_CHANNEL,
+            cache=cache.Cache(storage=cache.storage),
+            generations=generation.generations,
+        )
+        invalidation_task = asyncio.create_task(invalidation.invalidator.run())
+    if settings.CACHE_WARMUP_ENABLED:
+        # lifespan не завершается до конца прогрева, поэтому запросы начинают приниматься уже с тёплым кэшем.
+        # Прогревает один процесс, остальные читают прогретые им Redis и общую память узла.
+        warmer = CacheWarmer(
+            cache.Cache(storage=cache.storage),
+            elastic.es,
+            concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+            batch_size=settings.CACHE_WARMUP_BATCH_SIZE,
+            app=application,
+        )
+        try:
+            manifest = load_manifest(
+                settings.CACHE_WARMUP_MANIFEST, settings.CACHE_WARMUP_PAGES, settings.CACHE_WARMUP_TOP
+            )
+            loaded = await warm_up_once(
+                redis.redis, warmer, manifest, time_budget=settings.CACHE_WARMUP_TIME_BUDGET_IN_SECONDS
+            )
+            if loaded is None:
+                logging.info("cache warmup skipped: another process is warming up the cache")
+        except asyncio.TimeoutError:
+            logging.warning("cache warmup time budget exceeded")
+        except Exception:
+            logging.exception("cache warmup failed")
     yield
+    for task in (bloom_task, genre_registry_task, invalidation_task, snapshot_task):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if memory_cache and settings.MEMORY_CACHE_SNAPSHOT_PATH:
+        await snapshot.save_snapshot(
+            memory_cache,
+            settings.MEMORY_CACHE_SNAPSHOT_PATH,
+            settings.MEMORY_CACHE_SNAPSHOT_MAX_ENTRIES,
+            generation.generations,
+        )
+    if surrogate.surrogate_keys:
+        await surrogate.surrogate_keys.close()
+    if msearch.batcher:
+        await msearch.batcher.close()
+    if pit.point_in_times:
+        await pit.point_in_times.close()
     await redis.redis.close()
     await elastic.es.close()
     print("redis disconnection successful")
@@ -42,3 +176,4 @@ app = FastAPI(
 app.include_router(films.router, prefix="/api/v1/films", tags=["films"])
 app.include_router(persons.router, prefix="/api/v1/persons", tags=["persons"])
 app.include_router(genres.router, prefix="/api/v1/genres", tags=["genres"])
+app.include_router(cache_api.router, prefix="/api/v1/cache", tags=["cache"])
@@ -4,7 +4,22 @@ from typing import List
 from pydantic import BaseModel, Field
 
 
+class PersonFilm(BaseModel):
+    """Фильм персоны с её ролями в нём. Роли - из content.person_film_work.role: actor, director, writer."""
+
+    id: str = Field()
+    roles: List[str] = Field(default_factory=list)
+
+
 class Person(BaseModel):
     id: str = Field()
     full_name: str = Field()
     movies: List[str] = Field(default=None)
+    # INFO отсутствует в документах, загруженных до появления ролей в индексе
+    films: List[PersonFilm] | None = Field(default=None)
+
+    def get_film_ids(self) -> List[str] | None:
+        """id фильмов персоны. None - в документе нет ни films, ни movies."""
+        if self.films is not None:
+            return [film.id for film in self.films]
+        return self.movies
@@ -1,80 +1,291 @@
-import json
+import asyncio
+import logging
+import time
 from abc import ABC
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, Type
 
+from cache import bloom, generation, singleflight
 from cache.cache import Cache
+from cache.keys import build_cache_key
+from core.config import settings
+from db import msearch, pit
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Request
-from fastapi.datastructures import URL
-from pydantic import BaseModel
-from utils.utils import get_pagination_params
+from pydantic import BaseModel, create_model
+from services.query import build_query
+from utils.utils import InvalidCursor, decode_cursor, encode_cursor, get_pagination_params
+
+# Ссылки на фоновые задачи обновления кэша, чтобы их не удалил сборщик мусора до завершения.
+_background_tasks = set()
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logging.error("background cache refresh failed", exc_info=task.exception())
+
+
+@lru_cache(maxsize=128)
+def get_fields_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Облегчённая модель с частью полей model. Пример: get_fields_model(Film, ("id", "title"))."""
+    return create_model(
+        f"{model.__name__}Fields", **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
 
 
 class BaseService(ABC):
     """Абстрактный класс, реализующий базоый функционал сервиса.
 
     Используется только через наследование.
-    В классе-наследнике необходимо указать index, expire, model.
+    В классе-наследнике необходимо указать index, namespace, expire, model.
     index (str) - индекс для поиска в elasticsearch. Пример: "genres".
+    namespace (str) - пространство имён ключей кэша. Пример: "genres".
     expire (int) - срок хранения в кэше, в секундах. Пример: 300.
     model (BaseModel) - pydantic модель используемая в сервисе. Пример: Film, Genre, Person.
+    list_fields (List[str]) - поля объектов, нужные спискам по умолчанию. None - все поля. Пример: ["id", "title"].
+
+    Объекты с частью полей (см. get_fields_model) загружаются из elasticsearch с фильтрацией _source
+    и хранятся в кэше отдельно от полных объектов, в пространстве имён списков (см. _get_fields_key_prefix).
     """
 
     def __init__(self, cache: Cache, elastic: AsyncElasticsearch):
         self.cache = cache
         self.elastic = elastic
         self.index = ""
+        self.namespace = ""
         self.expire = 0
         self.model: BaseModel = None
+        self.list_fields: Optional[List[str]] = None
 
-    async def _get_from_cache(self, key: str) -> Optional[BaseModel | List[BaseModel]]:
-        data = await self.cache.get_cache(key)
-        if not data:
+    def _normalize_fields(self, fields: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+        """Поля в порядке объявления в модели, всегда с id. None - нужны все поля."""
+        if not fields:
             return None
+        fields = {*fields, "id"}
+        normalized = tuple(name for name in self.model.model_fields if name in fields)
+        if len(normalized) == len(self.model.model_fields):
+            return None
+        return normalized
 
-        validate_data = json.loads(data)
-        if isinstance(validate_data, list):
-            cache = [self.model.model_validate_json(entity) for entity in validate_data]
-        else:
-            cache = self.model.model_validate_json(data)
+    def get_model(self, fields: Optional[Iterable[str]] = None) -> Type[BaseModel]:
+        """Модель объектов с полями fields (см. get_fields_model)."""
+        fields = self._normalize_fields(fields)
+        return get_fields_model(self.model, fields) if fields else self.model
 
-        return cache
+    def _validate(self, data: Any, model: Optional[Type[BaseModel]] = None) -> Optional[BaseModel | List[BaseModel]]:
+        model = model or self.model
+        if data is None:
+            # Отрицательная запись кэша: объекта нет в хранилище.
+            return None
+        if isinstance(data, list):
+            return [model.model_validate(entity) for entity in data]
+        return model.model_validate(data)
 
-    async def _put_to_cache(self, key: str, data: BaseModel | List[BaseModel]):
+    async def _get_from_cache(self, key: str, raw: bool = False) -> Any:
+        """Получить данные из кэша.
+
+        raw (bool): вернуть значение как есть, без преобразования в модели.
+        """
+        entry = await self.cache.get_entry(key)
+        if not entry:
+            return None
+
+        return entry.value if raw else self._validate(entry.value)
+
+    async def _get_cached_or_missing(self, key: str, raw: bool = False) -> Any:
+        """Получить данные из кэша. Если ключа нет в кэше - singleflight.NOT_CACHED, отрицательная запись - None."""
+        entry = await self.cache.get_entry(key)
+        if not entry:
+            return singleflight.NOT_CACHED
+
+        return entry.value if raw else self._validate(entry.value)
+
+    async def _put_to_cache(self, key: str, data: BaseModel | List[BaseModel] | dict, delta: float = 0):
         """Положить данные в кэш.
 
         expire (int): срок хранения данных в кэше, в секундах. Указывается в классе-наследнике.
+        После expire данные ещё CACHE_STALE_TTL_IN_SECONDS секунд отдаются из кэша, пока обновляются в фоне.
+        delta (float): сколько секунд заняло получение данных из хранилища.
         """
         if isinstance(data, BaseModel):
-            await self.cache.set_cache(key, data.model_dump_json(), self.expire)
+            cache = data.model_dump(mode="json")
         elif isinstance(data, list):
-            cache = []
-            for obj in data:
-                cache.append(obj.model_dump_json())
-            await self.cache.set_cache(key.lower(), json.dumps(cache), self.expire)
+            cache = [obj.model_dump(mode="json") for obj in data]
+        elif isinstance(data, dict):
+            cache = data
+        else:
+            return
+
+        await self.cache.set_entry(key, cache, self.expire, settings.CACHE_STALE_TTL_IN_SECONDS, delta)
+
+    async def _put_negative_to_cache(self, key: str) -> None:
+        """Запомнить в кэше, что по ключу в хранилище ничего нет.
+
+        Запись живёт NEGATIVE_CACHE_EXPIRE_IN_SECONDS секунд, чтобы повторные запросы несуществующих объектов
+        (краулеры, устаревшие ссылки) не доходили до elasticsearch.
+        """
+        await self.cache.set_entry(key, None, settings.NEGATIVE_CACHE_EXPIRE_IN_SECONDS)
+
+    async def _get_key_prefix(self, namespace: str | None = None) -> str:
+        """Префикс ключей кэша с текущим поколением пространства имён. Пример: "films:3:".
+
+        По умолчанию используется пространство имён сервиса.
+        """
+        namespace = namespace or self.namespace
+        current = await generation.generations.get(namespace) if generation.generations else 0
+        return f"{namespace}:{current}:"
+
+    async def _get_key(self, key: str) -> str:
+        """Ключ кэша в пространстве имён сервиса. Пример: "films:3:<id>"."""
+        return f"{await self._get_key_prefix()}{key}"
+
+    async def _get_list_key(self, key: str) -> str:
+        """Ключ кэша производных данных сервиса: страниц и поиска. Пример: "films:lists:5:<key>".
+
+        Такие ключи сбрасываются при любом изменении объектов пространства имён (см. cache/invalidation.py).
+        """
+        return f"{await self._get_key_prefix(generation.get_lists_namespace(self.namespace))}{key}"
+
+    async def _get_fields_key_prefix(self, fields: Optional[Tuple[str, ...]]) -> str:
+        """Префикс ключей кэша объектов с полями fields. Пример: "films:lists:5:fields:id,title:".
+
+        Такие объекты хранятся в пространстве имён списков: оно сбрасывается при любом изменении объектов,
+        поэтому процессу API не нужно знать, какие наборы полей изменённого объекта лежат в кэше.
+        """
+        if not fields:
+            return await self._get_key_prefix()
+        return await self._get_list_key(f"fields:{','.join(fields)}:")
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], raw: bool = False) -> Any:
+        """Загрузить данные из хранилища при промахе кэша и положить их в кэш.
+
+        Одновременные промахи по одному ключу объединяются: хранилище опрашивается один раз,
+        остальные запросы получают тот же результат.
+        Если в lifespan включена распределённая блокировка, запросы объединяются и между процессами.
+        """
+
+        async def load_and_cache() -> Any:
+            started = time.monotonic()
+            data = await loader()
+            if data:
+                await self._put_to_cache(key=key, data=data, delta=time.monotonic() - started)
+            else:
+                await self._put_negative_to_cache(key)
+            return data
+
+        load = load_and_cache
+        if singleflight.lock_coalescer:
+            lock_coalescer = singleflight.lock_coalescer
+
+            async def load() -> Any:
+                return await lock_coalescer.run(key, load_and_cache, lambda: self._get_cached_or_missing(key, raw))
+
+        return await singleflight.single_flight.do(key, load)
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]], raw: bool = False) -> None:
+        """Обновить устаревшие данные в кэше, не задерживая ответ клиенту.
+
+        raw (bool): данные хранятся как есть, без преобразования в модели (см. _get_or_load).
+        """
+        task = asyncio.create_task(self._load(key, loader, raw))
+        _background_tasks.add(task)
+        task.add_done_callback(_on_background_task_done)
+
+    async def _get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], raw: bool = False) -> Any:
+        """Получить данные из кэша, а при промахе - из хранилища.
 
-    async def _get_from_elastic(self, id_: str) -> Optional[BaseModel]:
+        Устаревшие данные (stale-while-revalidate) отдаются сразу, а обновление запускается в фоне.
+        raw (bool): данные хранятся как есть, без преобразования в модели.
+        """
+        entry = await self.cache.get_entry(key)
+        if not entry:
+            return await self._load(key, loader, raw)
+
+        if entry.is_stale(settings.CACHE_EARLY_REFRESH_BETA):
+            self._refresh_in_background(key, loader, raw)
+        return entry.value if raw else self._validate(entry.value)
+
+    async def _get_from_elastic(self, id_: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[BaseModel]:
         try:
-            doc = await self.elastic.get(id=id_, index=self.index)
+            doc = await self.elastic.get(id=id_, index=self.index, source_includes=fields)
         except NotFoundError:
             return None
-        return self.model(**doc["_source"])
+        return self.get_model(fields)(**doc["_source"])
 
     async def get_by_id(self, id_: str) -> Optional[BaseModel]:
         """Обертка для запросов в кэш и хранилище."""
+        if bloom.id_filters and not bloom.id_filters.might_contain(self.namespace, id_):
+            # Фильтр Блума точно знает, что такого id нет - не ходим ни в кэш, ни в хранилище.
+            return None
+
         # Пытаемся получить данные из кеша, потому что оно работает быстрее
-        model = await self._get_from_cache(key=id_)
+        # Если фильма нет в кеше, то ищем его в Elasticsearch и сохраняем в кеш
+        model = await self._get_or_load(await self._get_key(id_), lambda: self._get_from_elastic(id_=id_))
         if not model:
-            # Если фильма нет в кеше, то ищем его в Elasticsearch
-            model = await self._get_from_elastic(id_=id_)
-            if not model:
-                # Если он отсутствует в Elasticsearch, значит, фильма вообще нет в базе
-                return None
-            # Сохраняем фильм в кеш
-            await self._put_to_cache(key=id_, data=model)
+            # Если он отсутствует в Elasticsearch, значит, фильма вообще нет в базе
+            return None
 
         return model
 
+    async def _get_many_from_elastic(self, ids: List[str], fields: Optional[Tuple[str, ...]] = None) -> List[BaseModel]:
+        data = await self.elastic.mget(index=self.index, ids=ids, source_includes=fields)
+        model = self.get_model(fields)
+        return [model(**doc["_source"]) for doc in data.body["docs"] if doc.get("found")]
+
+    async def get_many(self, ids: List[str], fields: Optional[Iterable[str]] = None) -> List[BaseModel]:
+        """Получить несколько объектов по id: один запрос в каждый уровень кэша и один _mget в elasticsearch.
+
+        Порядок результата совпадает с порядком ids, отсутствующие в базе объекты пропускаются.
+        fields - нужные поля объектов (sparse fieldset). Остальные поля не загружаются из elasticsearch.
+        """
+        ids = list(dict.fromkeys(ids))
+        if bloom.id_filters:
+            ids = [id_ for id_ in ids if bloom.id_filters.might_contain(self.namespace, id_)]
+        fields = self._normalize_fields(fields)
+        model = self.get_model(fields)
+        prefix = await self._get_fields_key_prefix(fields)
+        keys = {id_: f"{prefix}{id_}" for id_ in ids}
+        entries = await self.cache.get_many(keys.values())
+
+        models = {}
+        # id, которых по данным кэша нет в хранилище.
+        absent = set()
+        for id_, key in keys.items():
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            if entry.is_stale(settings.CACHE_EARLY_REFRESH_BETA):
+                # Объекты с частью полей не проходят валидацию полной моделью сервиса, поэтому raw=True.
+                self._refresh_in_background(
+                    key, lambda id_=id_: self._get_from_elastic(id_=id_, fields=fields), raw=True
+                )
+            if entry.value is None:
+                absent.add(id_)
+            else:
+                models[id_] = self._validate(entry.value, model)
+
+        missed = [id_ for id_ in ids if id_ not in models and id_ not in absent]
+        if missed:
+            started = time.monotonic()
+            loaded = await self._get_many_from_elastic(missed, fields)
+            delta = time.monotonic() - started
+            if loaded:
+                await self.cache.set_many(
+                    {f"{prefix}{model.id}": model.model_dump(mode="json") for model in loaded},
+                    self.expire,
+                    settings.CACHE_STALE_TTL_IN_SECONDS,
+                    delta,
+                )
+            models.update({model.id: model for model in loaded})
+            not_found = [id_ for id_ in missed if id_ not in models]
+            if not_found:
+                await self.cache.set_many(
+                    {f"{prefix}{id_}": None for id_ in not_found}, settings.NEGATIVE_CACHE_EXPIRE_IN_SECONDS
+                )
+
+        return [models[id_] for id_ in ids if id_ in models]
+
     async def _get_correct_params(self, query_params: dict) -> dict:
         if query_params:
             for param in query_params.items():
@@ -105,81 +316,31 @@ class BaseService(ABC):
                 query_params["sort"].append({"imdb_rating": "asc"})
         elif not sort:
             query_params['sort'] = [{"_score": "desc"}]
+        # Объекты с равными значениями сортировки упорядочиваются по id,
+        # иначе порядок между запросами не детерминирован и курсор может пропускать или повторять объекты.
+        query_params["sort"].append({"id": "asc"})
 
         query_params["offset"] = (query_params["page"] - 1) * query_params["per_page"]
 
         return query_params
 
-    async def _get_cache_key(self, url: URL) -> str:
-        return f"{url.path}?{url.query}"
+    async def _get_cache_key(self, path: str, params: dict) -> str:
+        return await self._get_list_key(build_cache_key(path, params))
 
-    async def _build_query_request(self, params: dict, url: URL, path_params: dict) -> dict:
-        """Сформировать поисковый запрос для elasticsearch.
+    async def _build_query_request(self, params: dict, path: str, path_params: dict) -> Optional[dict]:
+        """Сформировать поисковый запрос для elasticsearch по спецификации эндпоинта (см. services/query.py).
 
         params - параметры, которые идут после знака "?". Пример: /api/v1/person?sort=imdb_rating&page=1
         path_params - параметры, которые подставляются в path. Пример: /api/v1/person/{id}
         """
-        search_query = None
-        filter_by = params.get("filter_by")
-        query = params.get("query")
-        genre_name = params.get("genre")
-
-        # если есть параметры пути значит это запросы с .../{id}/...
-        if path_params:
-            person_id = path_params.get('person_id')
-            if f"/api/v1/persons/{person_id}/film" in url.path:
-                search_query = {
-                    "bool": {
-                        "should": [
-                            {"nested": {"path": "directors", "query": {"term": {"directors.id": person_id}}}},
-                            {"nested": {"path": "writers", "query": {"term": {"writers.id": person_id}}}},
-                            {"nested": {"path": "actors", "query": {"term": {"actors.id": person_id}}}},
-                        ]
-                    }
-                }
-
-        if url.path == "/api/v1/films":
-            if filter_by == "imdb_rating":
-                search_query = {"term": {filter_by: query}}
-            elif filter_by == "genre" and genre_name:
-                search_query = {"match": {"genres": genre_name}}
-            elif filter_by in ["title", "description"]:
-                search_query = {"match_phrase": {filter_by: {"query": query}}}
-            elif filter_by in ["actors", "directors", "writers"]:
-                search_query = {
-                    "bool": {
-                        "must": [
-                            {
-                                "nested": {
-                                    "path": filter_by,
-                                    "query": {
-                                        "bool": {"must": [{"match_phrase": {f"{filter_by}.name": {"query": query}}}]}
-                                    },
-                                }
-                            },
-                        ]
-                    }
-                }
-        elif url.path == "/api/v1/films/search":
-            search_query = {
-                "multi_match": {
-                    "query": query,
-                    # "fuzziness": "2",
-                    "fields": ["title", "description"],
-                }
-            }
-        elif url.path == "/api/v1/genres":
-            search_query = None
-        elif url.path == "/api/v1/persons/search":
-            search_query = {"match_phrase": {"full_name": {"query": query}}}
-        elif "/api/v1/persons/" in url.path and "film" in url.path:
-            person_id = params.get("person_id")
-
-        return search_query
-
-    async def get_objects(self, request: Request) -> Optional[List[BaseModel]]:
+        return build_query(path, params, path_params)
+
+    async def get_objects(self, request: Request, fields: Optional[List[str]] = None) -> Optional[List[BaseModel]]:
         """Получить список персон с пагинацией.
-        Данная реализация ограничена 10000 результатов и страдает от глубокой пагинации.
+        Пагинация через page ограничена 10000 результатов и страдает от глубокой пагинации,
+        поэтому для глубоких страниц используется курсор (параметр cursor, см. _search_after).
+        Курсор следующей страницы сохраняется в request.state.next_cursor.
+        fields - поля объектов ответа, по умолчанию list_fields сервиса.
         См. статью ниже - в ней описаны различные варианты пагинации и проблемы связанные с ними.
         https://opster.com/guides/elasticsearch/how-tos/elasticsearch-pagination-techniques/
 
@@ -189,29 +350,169 @@ class BaseService(ABC):
         Args:
             request (Request): инстанс запроса FastApi.
         """
-        url = request.url
         # INFO использовать _dict для query_params т.к. обновляю словарь на лету.
-        query_params = request.query_params._dict
-        path_params = request.path_params
+        objects, request.state.next_cursor = await self.search_page(
+            path=request.url.path,
+            query_params=request.query_params._dict,
+            path_params=request.path_params,
+            fields=fields,
+        )
+        return objects
+
+    async def search(
+        self, path: str, query_params: dict, path_params: dict | None = None, fields: Optional[List[str]] = None
+    ) -> Optional[List[BaseModel]]:
+        """Получить список объектов по пути эндпоинта и параметрам запроса (см. search_page)."""
+        objects, _ = await self.search_page(path, query_params, path_params, fields)
+        return objects
+
+    async def search_page(
+        self, path: str, query_params: dict, path_params: dict | None = None, fields: Optional[List[str]] = None
+    ) -> Tuple[Optional[List[BaseModel]], Optional[str]]:
+        """Получить список объектов по пути эндпоинта и параметрам запроса.
+
+        Не зависит от Request, поэтому подходит и для вызовов вне обработчиков запросов.
+        В кэше списка хранятся только упорядоченные id и общее количество найденных объектов,
+        сами объекты берутся из кэша объектов через get_many. Поэтому один объект хранится в кэше один раз,
+        сколько бы страниц и поисковых запросов его ни содержали.
+        Возвращает объекты страницы и курсор следующей страницы (None, если страница последняя).
+        Для повреждённого курсора или курсора другой сортировки - InvalidCursor.
+
+        Args:
+            path (str): путь эндпоинта. Пример: "/api/v1/films".
+            query_params (dict): параметры запроса. Пример: {"page": "1", "sort_by": "-imdb_rating", "cursor": "<cursor>"}.
+            path_params (dict): параметры пути. Пример: {"person_id": "<id>"}.
+            fields (List[str]): поля объектов, по умолчанию list_fields сервиса. Пример: ["id", "title"].
+        """
+        path_params = path_params or {}
+        fields = self._normalize_fields(fields or self.list_fields)
         params = await self._get_correct_params(query_params)
-        cache_key = await self._get_cache_key(url)
+        if params.get("cursor"):
+            # Курсор проверяется до обращения к кэшу, поэтому _search_in_elastic получает только корректный курсор.
+            if len(decode_cursor(str(params["cursor"]))) != len(params["sort"]):
+                # Курсор получен для другой сортировки или для списка id (см. get_page).
+                raise InvalidCursor(f"cursor does not match sort: {params['cursor']}")
+        cache_key = await self._get_cache_key(path, params)
+
+        page = await self._get_or_load(
+            cache_key,
+            lambda: self._search_in_elastic(params=params, path=path, path_params=path_params, fields=fields),
+            raw=True,
+        )
+        if not page:
+            return None, None
 
-        objects = await self._get_from_cache(key=cache_key)
+        objects = await self.get_many(page["ids"], fields)
         if not objects:
-            search_query = await self._build_query_request(params=params, url=url, path_params=path_params)
-            data = await self.elastic.search(
+            return None, None
+
+        return objects, page.get("next_cursor")
+
+    async def get_page(
+        self, ids: List[str], pagination: dict, sort_by: str | None = None, fields: Optional[List[str]] = None
+    ) -> Tuple[Optional[List[BaseModel]], Optional[str]]:
+        """Страница объектов из известного списка id - без поискового запроса, через кэш объектов и _mget.
+
+        Без сортировки загружаются только объекты страницы в порядке ids.
+        С сортировкой по полю sort_by ("-" - по убыванию, пример: "-imdb_rating") загружается весь список,
+        объекты без значения поля идут последними, при равных значениях - по id.
+        Курсор следующей страницы - её смещение в списке, для курсора другого вида - InvalidCursor.
+        Возвращает объекты страницы и курсор следующей страницы (None, если страница последняя).
+        """
+        ids = list(dict.fromkeys(ids))
+        per_page = pagination["per_page"]
+        offset = (pagination["page"] - 1) * per_page
+        if pagination.get("cursor"):
+            cursor = decode_cursor(pagination["cursor"])
+            if len(cursor) != 1 or not isinstance(cursor[0], int) or cursor[0] < 0:
+                # Курсор получен для поискового запроса, а не для списка id.
+                raise InvalidCursor(f"cursor is not a list offset: {pagination['cursor']}")
+            offset = cursor[0]
+        next_cursor = encode_cursor([offset + per_page]) if offset + per_page < len(ids) else None
+
+        fields = list(fields or self.list_fields or [])
+        if not sort_by:
+            objects = await self.get_many(ids[offset:offset + per_page], fields)
+            return objects or None, next_cursor
+
+        field = sort_by.lstrip("-")
+        if fields:
+            fields.append(field)
+        objects = await self.get_many(ids, fields)
+        present = sorted((obj for obj in objects if getattr(obj, field) is not None), key=lambda obj: obj.id)
+        # Сортировка устойчива, поэтому при равных значениях сохраняется порядок по id.
+        present.sort(key=lambda obj: getattr(obj, field), reverse=sort_by.startswith("-"))
+        objects = present + sorted((obj for obj in objects if getattr(obj, field) is None), key=lambda obj: obj.id)
+        return objects[offset:offset + per_page] or None, next_cursor
+
+    async def _search(self, **kwargs: Any) -> Any:
+        """Поиск в elasticsearch. Если в lifespan включено объединение запросов, поиск идёт в составе _msearch."""
+        if msearch.batcher:
+            return await msearch.batcher.search(**kwargs)
+        return await self.elastic.search(**kwargs)
+
+    async def _search_after(self, search_after: List[Any], **kwargs: Any) -> Any:
+        """Найти страницу после объекта со значениями сортировки search_after.
+
+        Стоимость запроса не зависит от глубины страницы. Если включён PIT (см. db/pit.py), поиск идёт по нему,
+        а истёкший PIT заменяется поиском по индексу.
+        """
+        if pit.point_in_times:
+            # Версия PIT - поколение списков: после изменения объектов открывается новый PIT.
+            pit_id = await pit.point_in_times.get(self.index, await self._get_list_key(""))
+            try:
+                return await self._search(
+                    pit={"id": pit_id, "keep_alive": pit.point_in_times.keep_alive}, search_after=search_after, **kwargs
+                )
+            except NotFoundError:
+                logging.warning("point in time of %s has expired", self.index)
+                pit.point_in_times.discard(self.index, pit_id)
+        return await self._search(index=self.index, search_after=search_after, **kwargs)
+
+    async def _search_in_elastic(
+        self, params: dict, path: str, path_params: dict, fields: Optional[Tuple[str, ...]] = None
+    ) -> Optional[dict]:
+        """Найти страницу объектов в elasticsearch.
+
+        Из _source загружаются только поля fields.
+        Найденные объекты сразу кладутся в кэш объектов с этими полями,
+        а возвращается страница вида {"ids": [...], "total": 0, "next_cursor": "<cursor>" | None}.
+        """
+        search_query = await self._build_query_request(params=params, path=path, path_params=path_params)
+        started = time.monotonic()
+        if params.get("cursor"):
+            data = await self._search_after(
+                decode_cursor(str(params["cursor"])), size=params["per_page"], sort=params["sort"], query=search_query, source_includes=fields
+            )
+        else:
+            data = await self._search(
                 index=self.index,
                 size=params["per_page"],
                 from_=params["offset"],
                 sort=params["sort"],
                 query=search_query,
+                source_includes=fields,
             )
-            objects = []
-            for doc in data.body["hits"]["hits"]:
-                objects.append(self.model(**doc["_source"]))
-            if not objects:
-                return None
+        delta = time.monotonic() - started
+        model = self.get_model(fields)
+        objects = []
+        for doc in data.body["hits"]["hits"]:
+            objects.append(model(**doc["_source"]))
+        if not objects:
+            return None
 
-            await self._put_to_cache(key=cache_key, data=objects)
+        prefix = await self._get_fields_key_prefix(fields)
+        await self.cache.set_many(
+            {f"{prefix}{obj.id}": obj.model_dump(mode="json") for obj in objects},
+            self.expire,
+            settings.CACHE_STALE_TTL_IN_SECONDS,
+            delta,
+        )
 
-        return objects
+        hits = data.body["hits"]["hits"]
+        next_cursor = encode_cursor(hits[-1]["sort"]) if len(hits) == params["per_page"] else None
+        return {
+            "ids": [obj.id for obj in objects],
+            "total": data.body["hits"]["total"]["value"],
+            "next_cursor": next_cursor,
+        }
@@ -8,13 +8,19 @@ from fastapi import Depends
 from models.film import Film
 from services.base import BaseService
 
+# Поля фильма, которые можно запросить через ?fields=. created_date и film_link отсутствуют в индексе.
+FILM_FIELDS = [name for name in Film.model_fields if name not in ("created_date", "film_link")]
+
 
 class FilmService(BaseService):
     def __init__(self, cache: Cache, elastic: AsyncElasticsearch):
         super().__init__(cache, elastic)
         self.index = "movies"
+        self.namespace = "films"
         self.expire = settings.FILM_CACHE_EXPIRE_IN_SECONDS
         self.model = Film
+        # Поля FilmDTO: спискам фильмов не нужны описание и составы участников.
+        self.list_fields = ["id", "title", "imdb_rating"]
 
 
 @lru_cache()
@@ -1,5 +1,6 @@
+import asyncio
 from functools import lru_cache
-from typing import Optional
+from typing import Iterable, List, Optional
 
 from cache.cache import Cache, get_cache_storage
 from core.config import settings
@@ -8,7 +9,9 @@ from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 from models.genre import Genre
 from pydantic import BaseModel
+from services import genre_registry
 from services.base import BaseService
+from services.genre_registry import normalize_name
 
 
 class GenreService(BaseService):
@@ -16,13 +19,14 @@ class GenreService(BaseService):
     def __init__(self, cache: Cache, elastic: AsyncElasticsearch):
         super().__init__(cache, elastic)
         self.index = "genres"
+        self.namespace = "genres"
         self.expire = settings.GENRE_CACHE_EXPIRE_IN_SECONDS
         self.model = Genre
 
     async def _get_genre_by_name_from_elastic(self, genre_name: str) -> Optional[Genre]:
-        data = await self.elastic.search(
+        data = await self._search(
             index=self.index,
-            query={"match_phrase": {"name": {"query": genre_name}}},
+            query={"term": {"name": {"value": genre_name, "case_insensitive": True}}},
         )
         for doc in data.body["hits"]["hits"]:
             if doc:
@@ -30,17 +34,33 @@ class GenreService(BaseService):
             return None
 
     async def get_genre_by_name(self, genre_name: str) -> Optional[BaseModel]:
-        """Обертка для запросов по названию жанра в кэш и хранилище."""
-        genre = await self._get_from_cache(key=genre_name)
-        if not genre:
-            genre = await self._get_genre_by_name_from_elastic(genre_name)
-            if not genre:
-                return None
+        """Найти жанр по названию без учёта регистра.
 
-            await self._put_to_cache(key=genre_name, data=genre)
+        Если справочник жанров загружен (см. services/genre_registry.py), жанр берётся из него без I/O,
+        иначе - из кэша и хранилища.
+        """
+        registry = genre_registry.registry
+        if registry and registry.loaded:
+            return registry.get_by_name(genre_name)
+
+        genre = await self._get_or_load(
+            await self._get_list_key(f"name:{normalize_name(genre_name)}"),
+            lambda: self._get_genre_by_name_from_elastic(genre_name),
+        )
+        if not genre:
+            return None
 
         return genre
 
+    async def get_genres_by_names(self, genre_names: Iterable[str]) -> List[Genre]:
+        """Найти жанры по названиям. Порядок сохраняется, неизвестные названия пропускаются."""
+        registry = genre_registry.registry
+        if registry and registry.loaded:
+            return registry.get_many_by_names(genre_names)
+
+        genres = await asyncio.gather(*(self.get_genre_by_name(genre_name) for genre_name in genre_names))
+        return [genre for genre in genres if genre]
+
 
 @lru_cache()
 def get_genre_service(
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from cache import generation
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+from models.genre import Genre
+
+
+def normalize_name(name: str) -> str:
+    """Ключ поиска жанра по названию: без учёта регистра и лишних пробелов. Пример: " sci-Fi " -> "sci-fi"."""
+    return " ".join(name.split()).casefold()
+
+
+class GenreRegistry:
+    """Справочник всех жанров в памяти процесса: по названию (без учёта регистра) и по id.
+
+    Жанров мало и они редко меняются, поэтому справочник загружается из elasticsearch целиком,
+    и жанры фильма находятся без запросов в Redis и elasticsearch.
+    Версия справочника - поколение списков жанров (см. get_lists_namespace): после публикации изменений жанров
+    справочник перезагружается в течение check_interval секунд, а без изменений - раз в refresh_interval секунд.
+    """
+
+    NAMESPACE = "genres"
+
+    def __init__(self, elastic: AsyncElasticsearch, index: str = "genres") -> None:
+        self.elastic = elastic
+        self.index = index
+        # Версия загруженного справочника. None - справочник ещё не загружен.
+        self.version: Optional[int] = None
+        self._by_name: Dict[str, Genre] = {}
+        self._by_id: Dict[str, Genre] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def get_by_name(self, name: str) -> Optional[Genre]:
+        return self._by_name.get(normalize_name(name))
+
+    def get_by_id(self, id_: str) -> Optional[Genre]:
+        return self._by_id.get(id_)
+
+    def get_many_by_names(self, names: Iterable[str]) -> List[Genre]:
+        """Жанры по названиям в том же порядке, неизвестные названия пропускаются."""
+        by_name = self._by_name
+        return [genre for genre in (by_name.get(normalize_name(name)) for name in names) if genre]
+
+    async def _get_version(self) -> int:
+        if not generation.generations:
+            return 0
+        return await generation.generations.get(generation.get_lists_namespace(self.NAMESPACE))
+
+    async def load(self) -> None:
+        version = await self._get_version()
+        genres = [
+            Genre(**doc["_source"])
+            async for doc in async_scan(self.elastic, index=self.index, query={"query": {"match_all": {}}})
+        ]
+        # Словари заменяются целиком: запросы видят либо старый, либо новый справочник.
+        self._by_name = {normalize_name(genre.name): genre for genre in genres}
+        self._by_id = {genre.id: genre for genre in genres}
+        self.version = version
+        logging.info("genre registry loaded: %s genres, version %s", len(genres), version)
+
+    async def run(self, check_interval: float, refresh_interval: float) -> None:
+        """Перезагружать справочник при смене версии или раз в refresh_interval секунд."""
+        loaded_at = time.monotonic()
+        while True:
+            await asyncio.sleep(check_interval)
+            try:
+                if await self._get_version() != self.version or time.monotonic() - loaded_at >= refresh_interval:
+                    await self.load()
+                    loaded_at = time.monotonic()
+            except Exception:
+                # Ошибка загрузки не должна останавливать сервис: остаётся предыдущий справочник.
+                logging.exception("genre registry was not reloaded")
+
+
+# Инициализируется в lifespan, если справочник включён в настройках.
+registry: Optional[GenreRegistry] = None
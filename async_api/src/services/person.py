@@ -14,6 +14,7 @@ class PersonService(BaseService):
     def __init__(self, cache: Cache, elastic: AsyncElasticsearch):
         super().__init__(cache, elastic)
         self.index = "persons"
+        self.namespace = "persons"
         self.expire = settings.PERSON_CACHE_EXPIRE_IN_SECONDS
         self.model = Person
 
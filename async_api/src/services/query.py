@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Контексты условий в bool-запросе elasticsearch.
+# filter - точные условия: не участвуют в расчёте релевантности и кэшируются elasticsearch (node query cache).
+# must - полнотекстовые условия, от которых зависит релевантность.
+FILTER = "filter"
+MUST = "must"
+
+# Роли персоны в фильме - nested-поля индекса movies.
+ROLES = ("directors", "writers", "actors")
+
+
+@dataclass(frozen=True)
+class Clause:
+    """Условие поискового запроса.
+
+    param - параметр запроса или пути, из значения которого строится условие. Пример: "imdb_rating_gte".
+    context - контекст условия в bool-запросе: FILTER или MUST.
+    build - построитель условия по значению параметра.
+    """
+
+    param: str
+    context: str
+    build: Callable[[Any], dict]
+
+
+def _match_phrase(field: str) -> Callable[[Any], dict]:
+    return lambda value: {"match_phrase": {field: {"query": value}}}
+
+
+def _person_name(role: str) -> Callable[[Any], dict]:
+    return lambda value: {"nested": {"path": role, "query": {"match_phrase": {f"{role}.name": {"query": value}}}}}
+
+
+def _genre(value: Any) -> dict:
+    # Точный поиск по keyword-подполю genres.raw. Индекс, созданный до его появления, подполя не содержит,
+    # поэтому жанр ищется и фразой в genres, как раньше, - до переиндексации фильтр не теряет фильмы.
+    return {
+        "bool": {
+            "should": [
+                {"term": {"genres.raw": {"value": value, "case_insensitive": True}}},
+                {"match_phrase": {"genres": {"query": value}}},
+            ],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+def _person_id(value: Any) -> dict:
+    return {
+        "bool": {
+            "should": [{"nested": {"path": role, "query": {"term": {f"{role}.id": value}}}} for role in ROLES],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+RATING_CLAUSES = [
+    Clause("imdb_rating", FILTER, lambda value: {"term": {"imdb_rating": value}}),
+    Clause("imdb_rating_gte", FILTER, lambda value: {"range": {"imdb_rating": {"gte": value}}}),
+    Clause("imdb_rating_lte", FILTER, lambda value: {"range": {"imdb_rating": {"lte": value}}}),
+]
+
+# Условия поиска для каждого эндпоинта. Новому эндпоинту со списком достаточно добавить сюда свою спецификацию.
+QUERY_SPECS: Dict[str, List[Clause]] = {
+    "/api/v1/films": [
+        *RATING_CLAUSES,
+        # Название жанра приходит из справочника жанров.
+        Clause("genre", FILTER, _genre),
+        Clause("title", MUST, _match_phrase("title")),
+        Clause("description", MUST, _match_phrase("description")),
+        *(Clause(role, MUST, _person_name(role)) for role in ROLES),
+    ],
+    "/api/v1/films/search": [
+        *RATING_CLAUSES,
+        Clause("query", MUST, lambda value: {"multi_match": {"query": value, "fields": ["title", "description"]}}),
+    ],
+    "/api/v1/genres": [],
+    "/api/v1/persons/search": [Clause("query", MUST, _match_phrase("full_name"))],
+    "/api/v1/persons/{person_id}/film": [Clause("person_id", FILTER, _person_id)],
+}
+
+
+def get_route_template(path: str, path_params: dict) -> str:
+    """Шаблон пути эндпоинта. Пример: "/api/v1/persons/<id>/film" -> "/api/v1/persons/{person_id}/film"."""
+    path = path.rstrip("/")
+    for name, value in path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}")
+    return path
+
+
+def build_query(path: str, params: dict, path_params: dict | None = None) -> Optional[dict]:
+    """Построить поисковый запрос по спецификации эндпоинта из QUERY_SPECS.
+
+    Параметры filter_by и query (?filter_by=title&query=Star) равнозначны параметру title=Star.
+    Без условий возвращается None - все документы индекса.
+    """
+    path_params = path_params or {}
+    values = {**params, **path_params}
+    filter_by = params.get("filter_by")
+    if filter_by and params.get("query") not in (None, ""):
+        values.setdefault(filter_by, params["query"])
+
+    bool_query = {}
+    for clause in QUERY_SPECS.get(get_route_template(path, path_params), []):
+        value = values.get(clause.param)
+        if value is None or value == "":
+            continue
+        bool_query.setdefault(clause.context, []).append(clause.build(value))
+    if not bool_query:
+        return None
+    return {"bool": bool_query}
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import time
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from cache import frequency, generation, surrogate
+from cache.cache import Cache, get_cache_storage
+from cache.keys import build_cache_key
+from core.config import settings
+from fastapi import Depends, Request, Response
+from pydantic import TypeAdapter
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость
+    brotli = None
+
+# Разделитель метаданных и тела в значении кэша. JSON метаданных не содержит переводов строк.
+SEPARATOR = b"\n"
+IDENTITY = "identity"
+# Кодировки сжатия в порядке предпочтения при равном q в Accept-Encoding.
+ENCODINGS = ("br", "gzip")
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """Сжатые варианты тела ответа. Небольшие тела не сжимаются."""
+    variants = {}
+    if len(body) < settings.RESPONSE_COMPRESSION_MIN_SIZE_IN_BYTES:
+        return variants
+    if brotli:
+        variants["br"] = brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    # mtime=0 - одинаковое тело всегда сжимается в одинаковые байты.
+    variants["gzip"] = gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    return variants
+
+
+def negotiate(accept_encoding: str | None, available: Iterable[str]) -> str:
+    """Выбрать кодировку ответа по заголовку Accept-Encoding. Пример: "gzip, deflate, br;q=0.9" -> "gzip"."""
+    if not accept_encoding:
+        return IDENTITY
+    weights = {}
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0
+        weights[encoding.strip().lower()] = weight
+
+    best, best_weight = IDENTITY, 0.0
+    for encoding in ENCODINGS:
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, weights.get("*", 0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class ResponseCache:
+    """Кэш готовых ответов API: JSON-тело в форме DTO и заголовки пагинации.
+
+    При попадании ответ отдаётся как есть, без построения моделей, валидации по response_model и сериализации.
+    Ключ строится по каноническому виду запроса в пространстве имён списков (см. get_lists_namespace),
+    поэтому сбрасывается при любом изменении объектов, из которых собран ответ.
+
+    Вместе с телом хранится его хэш - сильный ETag. Если клиент прислал совпадающий If-None-Match,
+    возвращается 304 без тела. Cache-Control: max-age равен оставшемуся сроку хранения ответа в кэше.
+
+    Тела от RESPONSE_COMPRESSION_MIN_SIZE_IN_BYTES байт при промахе сжимаются gzip и brotli (если установлен)
+    и хранятся рядом с исходным телом. Кодировка выбирается по Accept-Encoding, при попадании ничего не сжимается.
+
+    Заголовок Surrogate-Key перечисляет объекты и пространства имён, из которых собран ответ.
+    Если включён сброс кэша nginx, URL ответа запоминается под этими ключами (см. cache/surrogate.py)
+    один раз - при записи ответа в кэш. При попадании URL запоминается, только если он отличается от записанного:
+    один ответ отдаётся и на "?page=1", и на запрос без параметров, а nginx кэширует их по отдельности.
+    """
+
+    def __init__(self, cache: Cache, request: Request) -> None:
+        self.cache = cache
+        self.request = request
+
+    async def get_key(self, namespaces: Iterable[str], pagination: dict | None = None) -> str:
+        """Ключ ответа на текущий запрос. Пример: "films:lists:3:0:response:/api/v1/films/<id>?".
+
+        namespaces - пространства имён объектов, из которых собран ответ. Первое определяет префикс ключа.
+        pagination - параметры пагинации со значениями по умолчанию, чтобы "?page=1" и запрос без параметров
+        давали один ключ.
+        """
+        namespaces = list(namespaces)
+        generations = []
+        for namespace in namespaces:
+            lists_namespace = generation.get_lists_namespace(namespace)
+            generations.append(str(await generation.generations.get(lists_namespace) if generation.generations else 0))
+        params = {**self.request.query_params, **(pagination or {})}
+        return (
+            f"{generation.get_lists_namespace(namespaces[0])}:{':'.join(generations)}:"
+            f"response:{build_cache_key(self.request.url.path, params)}"
+        )
+
+    def _get_url(self) -> str:
+        return self.request.url.path + (f"?{self.request.url.query}" if self.request.url.query else "")
+
+    async def _register_surrogate_keys(self, surrogate_keys: List[str]) -> None:
+        if surrogate_keys and surrogate.surrogate_keys:
+            await surrogate.surrogate_keys.register(self._get_url(), surrogate_keys)
+
+    def _is_not_modified(self, etag: str) -> bool:
+        if_none_match = self.request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        # Сравнение для If-None-Match слабое: префикс W/ не учитывается.
+        candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+    def _respond(
+        self,
+        variants: Dict[str, bytes],
+        headers: Dict[str, str],
+        etag: str,
+        expires_at: float,
+        surrogate_keys: List[str],
+    ) -> Response:
+        encoding = negotiate(self.request.headers.get("accept-encoding"), variants)
+        body = variants[encoding]
+        headers = {
+            **headers,
+            "cache-control": f"max-age={max(0, round(expires_at - time.time()))}",
+        }
+        if encoding != IDENTITY:
+            headers["content-encoding"] = encoding
+            # У каждого варианта свой сильный ETag.
+            etag = f'{etag[:-1]}-{encoding}"'
+        headers["etag"] = etag
+        if len(variants) > 1:
+            headers["vary"] = "Accept-Encoding"
+        if surrogate_keys:
+            headers["surrogate-key"] = " ".join(surrogate_keys)
+        if self._is_not_modified(etag):
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def get(self, key: str) -> Optional[Response]:
+        # Обращение учитывается, как в Cache.get_entry: без частоты допуск TinyLFU не пустит ответ в L1.
+        # put всегда следует за промахом get, поэтому запись ответа отдельно не учитывается.
+        if frequency.tracker:
+            frequency.tracker.record(key)
+        cache = await self.cache.get_cache(key)
+        if cache is None:
+            return None
+
+        meta, data = bytes(cache).split(SEPARATOR, 1)
+        meta = orjson.loads(meta)
+        if meta["expires_at"] <= time.time():
+            # Уровень кэша может хранить ответ дольше его срока, например, после загрузки снимка L1.
+            return None
+        variants = {}
+        offset = 0
+        # Ответы, сохранённые до появления сжатия, содержат только исходное тело.
+        for encoding, size in meta.get("sizes", {IDENTITY: len(data)}).items():
+            variants[encoding] = data[offset:offset + size]
+            offset += size
+        # Ответы, сохранённые до появления поля url, регистрируются при каждом попадании, как раньше.
+        if meta.get("url") != self._get_url():
+            await self._register_surrogate_keys(meta["surrogate_keys"])
+        return self._respond(variants, meta["headers"], meta["etag"], meta["expires_at"], meta["surrogate_keys"])
+
+    async def put(
+        self,
+        key: str,
+        dto_type: Any,
+        data: Any,
+        expire: int,
+        headers: Dict[str, str] | None = None,
+        surrogate_keys: Iterable[str] = (),
+    ) -> Response:
+        """Сериализовать data в форме dto_type, положить ответ в кэш и вернуть его.
+
+        dto_type - тип ответа эндпоинта (его response_model). Пример: List[FilmDTO].
+        surrogate_keys - ключи объектов ответа (см. get_surrogate_keys). Пример: ["films", "films:<id>"].
+        """
+        adapter = TypeAdapter(dto_type)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        variants = {IDENTITY: body, **compress(body)}
+        meta = {
+            "headers": headers or {},
+            "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            "expires_at": time.time() + expire,
+            "surrogate_keys": list(dict.fromkeys(surrogate_keys)),
+            # URL, под которым ответ зарегистрирован в surrogate-ключах.
+            "url": self._get_url(),
+            # Варианты тела записываются друг за другом в этом порядке.
+            "sizes": {encoding: len(variant) for encoding, variant in variants.items()},
+        }
+        await self.cache.set_cache(key, orjson.dumps(meta) + SEPARATOR + b"".join(variants.values()), expire)
+        await self._register_surrogate_keys(meta["surrogate_keys"])
+        return self._respond(variants, meta["headers"], meta["etag"], meta["expires_at"], meta["surrogate_keys"])
+
+
+async def get_response_cache(request: Request, cache: Cache = Depends(get_cache_storage)) -> ResponseCache:
+    return ResponseCache(cache, request)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from http import HTTPStatus
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import orjson
+from cache.cache import Cache
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from services.base import BaseService
+from services.film import FilmService
+from services.genre import GenreService
+from services.person import PersonService
+from starlette.types import ASGIApp
+
+# Запрос в строке access-лога nginx. Пример: "GET /api/v1/films/<id> HTTP/1.1".
+REQUEST_RE = re.compile(r'"GET (?P<url>/api/v1/\S+) HTTP/[\d.]+"')
+# Запрос одного объекта. Пример: /api/v1/films/<uuid>.
+DETAILS_RE = re.compile(r"^/api/v1/(?P<namespace>films|persons|genres)/(?P<id>[0-9a-f-]{36})$")
+# Списки, которые можно прогреть через BaseService.search.
+LIST_PATHS = {
+    "/api/v1/films": "films",
+    "/api/v1/films/search": "films",
+    "/api/v1/persons/search": "persons",
+    "/api/v1/genres": "genres",
+}
+# Блокировка прогрева при запуске: прогревает один процесс из всех запущенных.
+WARMUP_LOCK = "lock:cache-warmup"
+
+
+def get_default_manifest(pages: int) -> dict:
+    """Манифест по умолчанию: все жанры и первые pages страниц фильмов в сортировках по рейтингу."""
+    return {
+        "ids": {},
+        "pages": [{"path": "/api/v1/genres", "params": {"page": page}} for page in range(1, pages + 1)]
+        + [
+            {"path": "/api/v1/films", "params": {"sort_by": sort_by, "page": page}}
+            for sort_by in ("-imdb_rating", "imdb_rating")
+            for page in range(1, pages + 1)
+        ],
+    }
+
+
+def get_manifest_from_access_log(path: str, top: int) -> dict:
+    """Построить манифест по access-логу nginx: top самых частых объектов и страниц списков."""
+    ids: Dict[str, Counter] = {}
+    pages: Counter = Counter()
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            match = REQUEST_RE.search(line)
+            if not match:
+                continue
+            url = urlsplit(match["url"])
+            details = DETAILS_RE.match(url.path)
+            if details:
+                ids.setdefault(details["namespace"], Counter())[details["id"]] += 1
+            elif url.path in LIST_PATHS:
+                pages[(url.path, url.query)] += 1
+
+    return {
+        "ids": {namespace: [id_ for id_, _ in counter.most_common(top)] for namespace, counter in ids.items()},
+        "pages": [{"path": path, "params": dict(parse_qsl(query))} for (path, query), _ in pages.most_common(top)],
+    }
+
+
+def load_manifest(path: Optional[str], pages: int, top: int) -> dict:
+    """Загрузить манифест прогрева.
+
+    path - JSON-файл вида {"ids": {"films": ["<id>", ...]}, "pages": [{"path": "/api/v1/films", "params": {}}]}
+    или access-лог nginx (любой другой файл). Без path используется манифест по умолчанию.
+    """
+    if not path:
+        return get_default_manifest(pages)
+    if path.endswith(".json"):
+        with open(path, "rb") as manifest:
+            return orjson.loads(manifest.read())
+    return get_manifest_from_access_log(path, top)
+
+
+def get_manifest_urls(manifest: dict) -> List[str]:
+    """URL запросов к API, которые описывает манифест: объекты и страницы списков."""
+    urls = [f"/api/v1/{namespace}/{id_}" for namespace, ids in manifest.get("ids", {}).items() for id_ in ids]
+    for page in manifest.get("pages", []):
+        params = page.get("params", {})
+        urls.append(f"{page['path']}?{urlencode(params)}" if params else page["path"])
+    return urls
+
+
+class CacheWarmer:
+    """Прогрев кэша по манифесту.
+
+    Объекты загружаются пакетами по batch_size через get_many (один _mget на пакет),
+    страницы списков - через search. Одновременно выполняется не больше concurrency запросов в elasticsearch.
+    Если передан app, затем те же URL запрашиваются у самого приложения, без сети:
+    так прогревается и кэш готовых ответов (ResponseCache), который горячие маршруты читают первым.
+    """
+
+    def __init__(
+        self,
+        cache: Cache,
+        elastic: AsyncElasticsearch,
+        concurrency: int,
+        batch_size: int,
+        app: Optional[ASGIApp] = None,
+    ) -> None:
+        self.services: Dict[str, BaseService] = {
+            "films": FilmService(cache, elastic),
+            "persons": PersonService(cache, elastic),
+            "genres": GenreService(cache, elastic),
+        }
+        self.batch_size = batch_size
+        self.app = app
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _get_many(self, service: BaseService, ids: List[str]) -> int:
+        async with self._semaphore:
+            return len(await service.get_many(ids))
+
+    async def _search(self, service: BaseService, path: str, params: dict) -> int:
+        async with self._semaphore:
+            # Параметры запроса приходят в search строками, как из Request.query_params.
+            objects = await service.search(path, {name: str(value) for name, value in params.items()})
+            return len(objects or [])
+
+    async def _get_response(self, client: httpx.AsyncClient, url: str) -> int:
+        async with self._semaphore:
+            response = await client.get(url)
+            return int(response.status_code == HTTPStatus.OK)
+
+    async def warm_up_responses(self, manifest: dict) -> int:
+        """Запросить URL манифеста у приложения и вернуть количество успешных ответов."""
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            results = await asyncio.gather(
+                *(self._get_response(client, url) for url in get_manifest_urls(manifest)), return_exceptions=True
+            )
+
+        cached = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning("cache warmup request failed: %r", result)
+            else:
+                cached += result
+        return cached
+
+    async def warm_up(self, manifest: dict) -> int:
+        """Прогреть кэш и вернуть количество загруженных объектов."""
+        started = time.monotonic()
+        tasks = []
+        for namespace, ids in manifest.get("ids", {}).items():
+            service = self.services[namespace]
+            for i in range(0, len(ids), self.batch_size):
+                tasks.append(self._get_many(service, ids[i:i + self.batch_size]))
+        for page in manifest.get("pages", []):
+            service = self.services[LIST_PATHS[page["path"]]]
+            tasks.append(self._search(service, page["path"], page.get("params", {})))
+
+        loaded = 0
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logging.warning("cache warmup request failed: %r", result)
+            else:
+                loaded += result
+        logging.info("cache warmed up: %s objects in %.2fs", loaded, time.monotonic() - started)
+
+        if self.app is not None:
+            # Объекты и страницы уже в кэше, поэтому ответы собираются без обращений в elasticsearch.
+            cached = await self.warm_up_responses(manifest)
+            logging.info("response cache warmed up: %s responses in %.2fs", cached, time.monotonic() - started)
+        return loaded
+
+
+async def warm_up_once(redis_adapter: Redis, warmer: CacheWarmer, manifest: dict, time_budget: float) -> Optional[int]:
+    """Прогреть кэш, если его не прогревает другой процесс, и вернуть количество загруженных объектов.
+
+    Прогревает процесс, захвативший блокировку WARMUP_LOCK, остальные сразу возвращают None:
+    Redis и общая память узла общие, поэтому прогрев в каждом процессе gunicorn только повторял бы запросы.
+    Блокировка не снимается и истекает через time_budget секунд, поэтому процессы,
+    запущенные позже в пределах того же бюджета, прогрев тоже не повторяют.
+    """
+    lock = redis_adapter.lock(WARMUP_LOCK, timeout=time_budget)
+    if not await lock.acquire(blocking=False):
+        return None
+    return await asyncio.wait_for(warmer.warm_up(manifest), timeout=time_budget)
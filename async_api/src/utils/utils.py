@@ -1,19 +1,43 @@
+import base64
+import binascii
 from enum import Enum
-from typing import Iterable
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, List
 
-from fastapi import Query, Response
+import orjson
+from fastapi import HTTPException, Query
 from pydantic import BaseModel
 
 
-async def update_headers(response: Response, pagination: dict, objects: Iterable) -> None:
-    if objects:
-        objects = str(len(objects))
-    else:
-        objects = "0"
+class InvalidCursor(ValueError):
+    """Некорректный курсор пагинации: повреждённый или полученный для другого списка."""
 
-    response.headers["x-total-count"] = objects
-    response.headers["x-page"] = str(pagination["page"])
-    response.headers["x-per-page"] = str(pagination["per_page"])
+
+def encode_cursor(sort_values: List[Any]) -> str:
+    """Непрозрачный курсор из значений сортировки последнего объекта страницы (hit["sort"] elasticsearch)."""
+    return base64.urlsafe_b64encode(orjson.dumps(sort_values)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Значения сортировки для search_after. Для некорректного курсора - InvalidCursor."""
+    try:
+        sort_values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, orjson.JSONDecodeError) as error:
+        raise InvalidCursor(f"invalid cursor: {cursor}") from error
+    if not isinstance(sort_values, list) or not sort_values:
+        raise InvalidCursor(f"invalid cursor: {cursor}")
+    return sort_values
+
+
+def get_pagination_headers(pagination: dict, objects: Iterable, next_cursor: str | None = None) -> Dict[str, str]:
+    headers = {
+        "x-total-count": str(len(objects)) if objects else "0",
+        "x-page": str(pagination["page"]),
+        "x-per-page": str(pagination["per_page"]),
+    }
+    if next_cursor:
+        headers["x-next-cursor"] = next_cursor
+    return headers
 
 
 def get_pagination_params(
@@ -21,8 +45,17 @@ def get_pagination_params(
     page: int = Query(1, gt=0),
     # per_page must be greater than 0
     per_page: int = Query(50, gt=0),
+    # Курсор из заголовка x-next-cursor предыдущей страницы. С курсором page не учитывается,
+    # а глубина обхода не ограничена окном в 10000 результатов.
+    cursor: str | None = Query(None),
 ) -> dict:
-    return {"page": page, "per_page": per_page}
+    # При вызове вне FastAPI значения по умолчанию - объекты Query.
+    if isinstance(cursor, str):
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+    return {"page": page, "per_page": per_page, "cursor": cursor}
 
 
 class OrderBy(str, Enum):
@@ -87,7 +120,30 @@ class FilmsSortQueryParams(BaseModel):
 class FilmsFilterQueryParams(BaseModel):
     filter_by: FilmsFilterBy| None = None
     query: str | None = None
+    imdb_rating_gte: float | None = None
+    imdb_rating_lte: float | None = None
 
 
 class FilmsFilterQueryParamsSearch(BaseModel):
     query: str
+    imdb_rating_gte: float | None = None
+    imdb_rating_lte: float | None = None
+
+
+class FieldsQueryParams(BaseModel):
+    """Поля объектов ответа через запятую (sparse fieldset). Пример: ?fields=title,description."""
+
+    fields: str | None = None
+
+    def get_fields(self, allowed: Iterable[str]) -> List[str] | None:
+        """Список запрошенных полей. Для полей не из allowed - 400."""
+        if not self.fields:
+            return None
+        allowed = list(allowed)
+        fields = [field.strip() for field in self.fields.split(",") if field.strip()]
+        if set(fields) - set(allowed):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Разрешенные поля: {', '.join(allowed)}",
+            )
+        return fields
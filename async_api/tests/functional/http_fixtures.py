@@ -1,3 +1,5 @@
+from http import HTTPStatus
+
 import pytest_asyncio
 import aiohttp
 
@@ -8,9 +10,10 @@ async def aiohttp_client():
 
 @pytest_asyncio.fixture(name="make_get_request")
 def make_get_request(aiohttp_client: aiohttp.ClientSession):
-    async def inner(url: str, query_data: dict):
-        response = await aiohttp_client.get(url=url, params=query_data)
-        body = await response.json()
+    async def inner(url: str, query_data: dict, headers: dict | None = None):
+        response = await aiohttp_client.get(url=url, params=query_data, headers=headers)
+        # У ответа 304 нет тела и Content-Type, response.json() для него выбрасывает ContentTypeError.
+        body = None if response.status == HTTPStatus.NOT_MODIFIED else await response.json()
         headers = response.headers
         status = response.status
         return body, headers, status
@@ -122,3 +122,151 @@ async def test_cache_by_id(
     body, headers, status = await make_get_request(url, query_data)
 
     assert body is not None
+
+
+@pytest.mark.parametrize(
+    'query_data, es_film_data, es_genre_data',
+    [
+        (
+            {'film_id': 'my_uuid'},
+            one_film,
+            [{"id": "1", "name": "Action"}],
+        ),
+    ],
+    ids=["test_etag"],
+)
+@pytest.mark.asyncio
+async def test_not_modified_by_etag(
+    make_get_request,
+    es_remove_data,
+    es_write_data,
+    es_film_data: list[dict],
+    es_genre_data: list[dict],
+    query_data: dict,
+):
+    await es_write_data(es_film_data, index=test_settings.ES_FILM_INDEX, mapping=test_settings.ES_FILM_INDEX_MAPPING)
+    await es_write_data(es_genre_data, index=test_settings.ES_GENRE_INDEX, mapping=test_settings.ES_GENRE_INDEX_MAPPING)
+
+    url = f"{test_settings.SERVICE_URL}/api/v1/films/{query_data['film_id']}"
+    body, headers, status = await make_get_request(url, {})
+    etag = headers['ETag']
+
+    body, headers, status = await make_get_request(url, {}, headers={'If-None-Match': etag})
+
+    await es_remove_data(es_film_data, index=test_settings.ES_FILM_INDEX)
+    await es_remove_data(es_genre_data, index=test_settings.ES_GENRE_INDEX)
+
+    assert status == HTTPStatus.NOT_MODIFIED
+    assert body is None
+    assert headers['ETag'] == etag
+    assert headers['Cache-Control'].startswith('max-age=')
+
+
+@pytest.mark.parametrize(
+    'query_data, es_data',
+    [
+        (
+            {'per_page': 25, 'sort_by': '-imdb_rating'},
+            film_collections,
+        ),
+    ],
+    ids=["test_cursor"],
+)
+@pytest.mark.asyncio
+async def test_cursor_pagination(
+    make_get_request, es_remove_data, es_write_data, es_data: list[dict], query_data: dict
+):
+    await es_write_data(es_data, index=test_settings.ES_FILM_INDEX, mapping=test_settings.ES_FILM_INDEX_MAPPING)
+
+    url = f"{test_settings.SERVICE_URL}/api/v1/films"
+    ids = []
+    body, headers, status = await make_get_request(url, query_data)
+    while True:
+        assert status == HTTPStatus.OK
+        ids.extend(film['id'] for film in body)
+        if 'x-next-cursor' not in headers:
+            break
+        body, headers, status = await make_get_request(url, {**query_data, 'cursor': headers['x-next-cursor']})
+
+    _, _, invalid_status = await make_get_request(url, {'cursor': 'not a cursor'})
+
+    await es_remove_data(es_data, index=test_settings.ES_FILM_INDEX)
+
+    # Все фильмы по одному разу, без пропусков и повторов на границах страниц.
+    assert len(ids) == len(es_data)
+    assert len(set(ids)) == len(es_data)
+    assert invalid_status == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    'query_data, expected_answer, es_data',
+    [
+        (
+            {'fields': 'title,description'},
+            {'status': HTTPStatus.OK, 'keys': {'id', 'title', 'description'}},
+            film_collections,
+        ),
+        (
+            {'fields': 'title,unknown'},
+            {'status': HTTPStatus.BAD_REQUEST},
+            film_collections,
+        ),
+    ],
+    ids=["test_fields", "test_unknown_fields"],
+)
+@pytest.mark.asyncio
+async def test_sparse_fieldset(
+    make_get_request, es_remove_data, es_write_data, es_data: list[dict], query_data: dict, expected_answer: dict
+):
+    await es_write_data(es_data, index=test_settings.ES_FILM_INDEX, mapping=test_settings.ES_FILM_INDEX_MAPPING)
+
+    url = f"{test_settings.SERVICE_URL}/api/v1/films"
+    body, headers, status = await make_get_request(url, query_data)
+
+    await es_remove_data(es_data, index=test_settings.ES_FILM_INDEX)
+
+    assert status == expected_answer['status']
+    if expected_answer.get('keys'):
+        assert all(set(film) == expected_answer['keys'] for film in body)
+
+
+@pytest.mark.parametrize(
+    'query_data, expected_answer, es_data',
+    [
+        (
+            {'imdb_rating_gte': 8, 'imdb_rating_lte': 9, 'per_page': 60},
+            {'status': HTTPStatus.OK, 'length': 60},
+            film_collections,
+        ),
+        (
+            {'imdb_rating_gte': 9},
+            {'status': HTTPStatus.NOT_FOUND},
+            film_collections,
+        ),
+        (
+            {'filter_by': 'genre', 'query': 'sci-fi', 'per_page': 60},
+            {'status': HTTPStatus.OK, 'length': 60},
+            film_collections,
+        ),
+    ],
+    ids=["test_rating_range", "test_rating_range_empty", "test_genre_filter"],
+)
+@pytest.mark.asyncio
+async def test_film_filters(
+    make_get_request, es_remove_data, es_write_data, es_data: list[dict], query_data: dict, expected_answer: dict
+):
+    await es_write_data(es_data, index=test_settings.ES_FILM_INDEX, mapping=test_settings.ES_FILM_INDEX_MAPPING)
+    await es_write_data(
+        [{"id": "1", "name": "Action"}, {"id": "2", "name": "Sci-Fi"}],
+        index=test_settings.ES_GENRE_INDEX,
+        mapping=test_settings.ES_GENRE_INDEX_MAPPING,
+    )
+
+    url = f"{test_settings.SERVICE_URL}/api/v1/films"
+    body, headers, status = await make_get_request(url, query_data)
+
+    await es_remove_data(es_data, index=test_settings.ES_FILM_INDEX)
+
+    assert status == expected_answer['status']
+    if expected_answer.get('length'):
+        assert len(body) == expected_answer['length']
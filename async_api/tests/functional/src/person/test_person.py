@@ -1,11 +1,13 @@
 import asyncio
+import base64
+import json
 from http import HTTPStatus
 
 import pytest
 from plugins import pytest_plugins
 from settings import test_settings
-from testdata.data.film import film_collections, one_film
-from testdata.data.person import one_person
+from testdata.data.film import film_collections, one_film, rated_film_collections
+from testdata.data.person import one_person, person_with_film_collections, person_with_rated_films
 
 """
 все граничные случаи по валидации данных;
@@ -59,6 +61,8 @@ async def test_get_person_by_id(
 
     assert status == expected_answer["status"]
     assert body["id"] == expected_answer["person_id"]
+    # Роли берутся из документа персоны, фильмы к этому моменту уже удалены из индекса.
+    assert body["films"] == [{"uuid": "my_uuid", "roles": ["director"]}]
 
 
 @pytest.mark.parametrize(
@@ -68,7 +72,7 @@ async def test_get_person_by_id(
             {"person_id": "person_uuid", "page": 1, "per_page": len(film_collections)},
             {"status": HTTPStatus.OK, "count": len(film_collections)},
             film_collections,
-            one_person,
+            person_with_film_collections,
         ),
     ],
 )
@@ -107,6 +111,78 @@ async def test_get_person_films(
     assert len(body) == expected_answer["count"]
 
 
+@pytest.mark.parametrize(
+    "query_data, es_film_data, es_person_data",
+    [
+        (
+            {"per_page": 8},
+            rated_film_collections,
+            person_with_rated_films,
+        ),
+        (
+            {"per_page": 8, "sort_by": "-imdb_rating"},
+            rated_film_collections,
+            person_with_rated_films,
+        ),
+        (
+            {"per_page": 8, "sort_by": "imdb_rating"},
+            rated_film_collections,
+            person_with_rated_films,
+        ),
+    ],
+    ids=["test_movies_order", "test_sort_desc", "test_sort_asc"],
+)
+@pytest.mark.asyncio
+async def test_get_person_films_pages(
+    es_remove_data,
+    make_get_request,
+    es_write_data,
+    es_film_data: list[dict],
+    es_person_data: list[dict],
+    query_data: dict,
+):
+    await es_write_data(es_film_data, index=test_settings.ES_FILM_INDEX, mapping=test_settings.ES_FILM_INDEX_MAPPING)
+    await es_write_data(
+        es_person_data, index=test_settings.ES_PERSON_INDEX, mapping=test_settings.ES_PERSON_INDEX_MAPPING
+    )
+
+    url = f"{test_settings.SERVICE_URL}/api/v1/persons/person_uuid/film"
+    films = []
+    body, headers, status = await make_get_request(url, query_data)
+    while True:
+        assert status == HTTPStatus.OK
+        assert len(body) <= query_data["per_page"]
+        films.extend(body)
+        if "x-next-cursor" not in headers:
+            break
+        body, headers, status = await make_get_request(url, {**query_data, "cursor": headers["x-next-cursor"]})
+
+    # Вторая страница по номеру совпадает со второй страницей по курсору.
+    second_page, _, _ = await make_get_request(url, {**query_data, "page": 2})
+    # Курсор поискового запроса (значения сортировки) к списку фильмов персоны не подходит.
+    search_cursor = base64.urlsafe_b64encode(json.dumps([8.5, "id"]).encode()).rstrip(b"=").decode()
+    _, _, foreign_cursor_status = await make_get_request(url, {**query_data, "cursor": search_cursor})
+
+    await es_remove_data(es_film_data, index=test_settings.ES_FILM_INDEX)
+    await es_remove_data(es_person_data, index=test_settings.ES_PERSON_INDEX)
+
+    ids = [film["id"] for film in films]
+    movies = es_person_data[0]["movies"]
+    assert sorted(ids) == sorted(movies)
+    assert [film["id"] for film in second_page] == ids[query_data["per_page"]:2 * query_data["per_page"]]
+    assert foreign_cursor_status == HTTPStatus.BAD_REQUEST
+
+    sort_by = query_data.get("sort_by")
+    if not sort_by:
+        assert ids == movies
+        return
+    ratings = {film["id"]: film["imdb_rating"] for film in es_film_data}
+    rated = [ratings[id_] for id_ in ids if ratings[id_] is not None]
+    assert rated == sorted(rated, reverse=sort_by.startswith("-"))
+    # Фильмы без рейтинга - в конце списка.
+    assert all(ratings[id_] is None for id_ in ids[len(rated):])
+
+
 @pytest.mark.parametrize(
     "query_data, expected_answer, es_film_data,es_person_data",
     [
@@ -47,4 +47,10 @@ one_film =                 [
             "actors_names": ["Ann", "Bob"],
             "writers_names": ["Ben", "Howard"],
         }
-    ]
\ No newline at end of file
+    ]
+
+# Фильмы с разным рейтингом (и без рейтинга) - для проверки сортировки.
+rated_film_collections = [
+    {**film, "id": str(uuid.uuid4()), "imdb_rating": rating}
+    for film, rating in zip(film_collections, [*(i / 2 for i in range(18)), None, None])
+]
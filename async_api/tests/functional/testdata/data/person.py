@@ -1,5 +1,21 @@
+from testdata.data.film import film_collections, rated_film_collections
+
 one_person = [{
     "id": "person_uuid",
     "full_name": "George Lucas",
-    "movies": ["my_uuid"]
-}]
\ No newline at end of file
+    "movies": ["my_uuid"],
+    "films": [{"id": "my_uuid", "roles": ["director"]}],
+}]
+
+# Фильмография персоны - список movies, по которому API отдаёт страницы /persons/<id>/film.
+person_with_film_collections = [{
+    "id": "person_uuid",
+    "full_name": "George Lucas",
+    "movies": [film["id"] for film in film_collections],
+}]
+
+person_with_rated_films = [{
+    "id": "person_uuid",
+    "full_name": "George Lucas",
+    "movies": [film["id"] for film in rated_film_collections],
+}]
@@ -29,7 +29,8 @@ mapping = {
         "properties": {
             "id": {"type": "keyword"},
             "imdb_rating": {"type": "float"},
-            "genres": {"type": "text"},
+            # raw - точный поиск жанра в контексте filter
+            "genres": {"type": "text", "fields": {"raw": {"type": "keyword"}}},
             "title": {"type": "text", "analyzer": "ru_en", "fields": {"raw": {"type": "keyword"}}},
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors_names": {"type": "text", "analyzer": "ru_en"},
@@ -29,7 +29,13 @@ mapping = {
         "properties": {
             "id": {"type": "keyword"},
             "full_name": {"type": "text", "analyzer": "standard"},
-            "movies": {"type": "keyword"}
+            "movies": {"type": "keyword"},
+            # Фильмы персоны с её ролями, см. content.person_film_work.role
+            "films": {
+                "type": "nested",
+                "dynamic": "strict",
+                "properties": {"id": {"type": "keyword"}, "roles": {"type": "keyword"}},
+            },
         }
     },
 }
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# Модули сервиса импортируются так же, как в контейнере (WORKDIR /async_api/src).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "src"))
+
+# Обязательные настройки сервиса. В контейнере tests они приходят из .env, внешние сервисы не используются.
+for name, value in {
+    "PROJECT_NAME": "movies",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "ELASTICSEARCH_HOST": "localhost",
+    "ELASTICSEARCH_PORT": "9200",
+    "SQL_ENGINE": "django.db.backends.postgresql_psycopg2",
+    "FILM_CACHE_EXPIRE_IN_SECONDS": "300",
+    "PERSON_CACHE_EXPIRE_IN_SECONDS": "300",
+    "GENRE_CACHE_EXPIRE_IN_SECONDS": "300",
+    "LOG_LEVEL": "INFO",
+}.items():
+    os.environ.setdefault(name, value)
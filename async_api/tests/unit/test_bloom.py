@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from cache import bloom
+from cache.bloom import BloomFilter, IdFilters
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(capacity=100)
+    ids = [f"id-{i}" for i in range(100)]
+    for id_ in ids:
+        bloom_filter.add(id_)
+
+    assert all(id_ in bloom_filter for id_ in ids)
+
+
+@pytest.mark.asyncio
+async def test_ids_added_during_rebuild_are_kept(monkeypatch):
+    """id, опубликованный во время обхода индекса, попадает в новый фильтр, даже если обход его не застал."""
+    scan_started = asyncio.Event()
+    scan_resumed = asyncio.Event()
+
+    async def fake_scan(*args, **kwargs):
+        yield {"_id": "old"}
+        scan_started.set()
+        await scan_resumed.wait()
+        yield {"_id": "existing"}
+
+    monkeypatch.setattr(bloom, "async_scan", fake_scan)
+    id_filters = IdFilters(elastic=None, indexes={"films": "movies"})
+
+    rebuild = asyncio.create_task(id_filters.rebuild("films"))
+    await scan_started.wait()
+    id_filters.add("films", "published")
+    scan_resumed.set()
+    await rebuild
+
+    assert id_filters.might_contain("films", "published")
+    assert id_filters.might_contain("films", "existing")
+
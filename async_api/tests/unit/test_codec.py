@@ -0,0 +1,114 @@
+import orjson
+import pytest
+from cache import codec as codec_module
+from cache.codec import NO_COMPRESSION, CacheSerializer, OrjsonCodec, build_serializer
+
+VALUE = {"id": "3d825f60-9fff-4dfe-b294-1a45fa1e115d", "title": "Star Wars", "imdb_rating": 8.6, "genres": ["Sci-Fi"] * 200}
+
+
+def get_serializer(codec_name: str, compression: str | None, compress_threshold: int = 16) -> CacheSerializer:
+    """Сериализатор с заданными настройками; пропускает тест без необязательного пакета."""
+    if codec_name == "msgpack":
+        pytest.importorskip("msgpack")
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    if compression == "lz4":
+        pytest.importorskip("lz4.frame")
+    return build_serializer(codec_name, compression, compress_threshold)
+
+
+@pytest.mark.parametrize("codec_name", ["orjson", "msgpack"])
+@pytest.mark.parametrize("compression", [None, "zstd", "lz4"])
+def test_round_trip(codec_name, compression):
+    serializer = get_serializer(codec_name, compression)
+    data = serializer.encode(VALUE)
+
+    assert data[0] == CacheSerializer.VERSION
+    assert data[1] == serializer.codec.format_id
+    expected_compression = serializer.compressor.compression_id if serializer.compressor else NO_COMPRESSION
+    assert data[2] == expected_compression
+    assert serializer.decode(data) == VALUE
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4"])
+def test_small_values_are_not_compressed(compression):
+    serializer = get_serializer("orjson", compression, compress_threshold=1024)
+    data = serializer.encode({"id": "1"})
+
+    assert data[2] == NO_COMPRESSION
+    assert serializer.decode(data) == {"id": "1"}
+
+
+@pytest.mark.parametrize(
+    "writer, reader",
+    [
+        (("orjson", None), ("msgpack", "zstd")),
+        (("msgpack", "zstd"), ("orjson", None)),
+        (("orjson", "lz4"), ("orjson", "zstd")),
+        (("msgpack", "lz4"), ("orjson", None)),
+    ],
+)
+def test_reads_values_written_with_other_settings(writer, reader):
+    """Смена формата или сжатия в настройках не превращает старые значения в промахи."""
+    data = get_serializer(*writer).encode(VALUE)
+
+    assert get_serializer(*reader).decode(data) == VALUE
+
+
+def test_decodes_str():
+    serializer = get_serializer("orjson", None)
+
+    assert serializer.decode(serializer.encode(VALUE).decode()) == VALUE
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        # Значение, записанное до появления заголовка версии.
+        orjson.dumps(VALUE),
+        orjson.dumps([1.0, 0.5, VALUE]),
+        # Другая версия заголовка.
+        bytes((0, OrjsonCodec.format_id, NO_COMPRESSION)) + orjson.dumps(VALUE),
+        bytes((CacheSerializer.VERSION + 1, OrjsonCodec.format_id, NO_COMPRESSION)) + orjson.dumps(VALUE),
+        # Неизвестный формат.
+        bytes((CacheSerializer.VERSION, 99, NO_COMPRESSION)) + orjson.dumps(VALUE),
+        # Неизвестное сжатие.
+        bytes((CacheSerializer.VERSION, OrjsonCodec.format_id, 99)) + orjson.dumps(VALUE),
+        # Обрезанный заголовок.
+        b"",
+        bytes((CacheSerializer.VERSION, OrjsonCodec.format_id)),
+    ],
+)
+def test_unknown_header_is_miss(data):
+    assert get_serializer("orjson", None).decode(data) is None
+
+
+def test_compression_without_package_is_miss(monkeypatch):
+    """Значение, сжатое алгоритмом, пакета которого нет в этом процессе, считается промахом."""
+    writer = get_serializer("orjson", "zstd")
+    data = writer.encode(VALUE)
+
+    monkeypatch.setattr(codec_module, "zstandard", None)
+    reader = build_serializer("orjson", None, 16)
+
+    assert reader.decode(data) is None
+
+
+@pytest.mark.parametrize(
+    "codec_name, compression",
+    [("pickle", None), ("orjson", "gzip")],
+)
+def test_unknown_settings_raise(codec_name, compression):
+    with pytest.raises(ValueError):
+        build_serializer(codec_name, compression, 1024)
+
+
+@pytest.mark.parametrize(
+    "module, codec_name, compression",
+    [("msgpack", "msgpack", None), ("zstandard", "orjson", "zstd"), ("lz4", "orjson", "lz4")],
+)
+def test_missing_package_raises(monkeypatch, module, codec_name, compression):
+    monkeypatch.setattr(codec_module, module, None)
+
+    with pytest.raises(ValueError):
+        build_serializer(codec_name, compression, 1024)
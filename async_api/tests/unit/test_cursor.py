@@ -0,0 +1,43 @@
+import pytest
+from services.film import FilmService
+from utils.utils import InvalidCursor, decode_cursor, encode_cursor
+
+PAGINATION = {"page": 1, "per_page": 2}
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", "W10"])
+def test_decode_invalid_cursor(cursor):
+    # "e30" - {}, "W10" - [].
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_invalid_cursor_is_value_error():
+    """Вызовы, которые ловят ValueError от decode_cursor, продолжают работать."""
+    assert issubclass(InvalidCursor, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_search_page_rejects_cursor_of_other_sort():
+    """Курсор с другим количеством значений сортировки отклоняется до обращения к кэшу и elasticsearch."""
+    service = FilmService(cache=None, elastic=None)
+
+    with pytest.raises(InvalidCursor):
+        await service.search_page("/api/v1/films", {"cursor": encode_cursor([8.6, "id", "extra", "values"])})
+
+
+@pytest.mark.asyncio
+async def test_search_page_rejects_malformed_cursor():
+    service = FilmService(cache=None, elastic=None)
+
+    with pytest.raises(InvalidCursor):
+        await service.search_page("/api/v1/films", {"cursor": "not a cursor"})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_values", [[8.6, "id"], ["2"], [-1]])
+async def test_get_page_rejects_non_offset_cursor(sort_values):
+    service = FilmService(cache=None, elastic=None)
+
+    with pytest.raises(InvalidCursor):
+        await service.get_page(["1", "2", "3"], {**PAGINATION, "cursor": encode_cursor(sort_values)})
@@ -0,0 +1,189 @@
+import pytest
+from cache import frequency
+from cache.cache import Cache
+from cache.frequency import CountMinSketch, FrequencyTracker
+from cache.memory import InMemoryCacheStorage
+
+
+def get_tracker(sample_size: int = 10_000) -> FrequencyTracker:
+    return FrequencyTracker(width=1024, depth=4, sample_size=sample_size, min_ttl_factor=0.5, max_ttl_factor=4)
+
+
+class RecordingStorage(InMemoryCacheStorage):
+    """Хранилище в памяти, запоминающее сроки хранения записанных ключей."""
+
+    def __init__(self) -> None:
+        super().__init__(100, 1024 * 1024)
+        self.expires = {}
+
+    async def save_cache(self, key, cache, expire=None):
+        self.expires[key] = expire
+        await super().save_cache(key, cache, expire)
+
+
+def test_sketch_counts():
+    sketch = CountMinSketch(width=1024, depth=4, sample_size=10_000)
+    for _ in range(5):
+        sketch.add("films:0:hot")
+    sketch.add("films:0:cold")
+
+    assert sketch.estimate("films:0:hot") == 5
+    assert sketch.estimate("films:0:cold") == 1
+    assert sketch.estimate("films:0:unknown") == 0
+
+
+def test_sketch_never_underestimates():
+    """Даже при множестве коллизий в узком sketch оценка не меньше настоящей частоты."""
+    sketch = CountMinSketch(width=8, depth=2, sample_size=10_000)
+    counts = {f"films:0:{i}": i % 7 + 1 for i in range(50)}
+    for key, count in counts.items():
+        for _ in range(count):
+            sketch.add(key)
+
+    assert all(sketch.estimate(key) >= count for key, count in counts.items())
+
+
+def test_sketch_ages_after_sample_size():
+    sketch = CountMinSketch(width=1024, depth=4, sample_size=10)
+    for _ in range(8):
+        sketch.add("films:0:hot")
+    sketch.add("films:0:cold")
+    sketch.add("films:0:cold")
+
+    assert sketch.resets == 1
+    assert sketch.additions == 5
+    assert sketch.estimate("films:0:hot") == 4
+    assert sketch.estimate("films:0:cold") == 1
+
+
+def test_tracker_namespaces_are_independent():
+    tracker = get_tracker(sample_size=4)
+    for _ in range(3):
+        tracker.record("films:0:1")
+    for _ in range(4):
+        tracker.record("persons:0:1")
+
+    # Старение sketch персон не затрагивает фильмы.
+    assert tracker.estimate("films:0:1") == 3
+    assert tracker.estimate("persons:0:1") == 2
+    assert tracker.stats()["persons"]["resets"] == 1
+    assert tracker.stats()["films"]["resets"] == 0
+
+
+def test_tracker_top_keys_age():
+    tracker = FrequencyTracker(width=1024, depth=4, sample_size=6, min_ttl_factor=0.5, max_ttl_factor=4, top_size=2)
+    for key, count in (("films:0:a", 3), ("films:0:c", 2), ("films:0:b", 1)):
+        for _ in range(count):
+            tracker.record(key)
+
+    # Шестое обращение состарило счётчики: оценки в топе поделены пополам.
+    assert tracker.stats()["films"]["top"] == [("films:0:a", 1), ("films:0:c", 1)]
+
+
+def test_admit():
+    tracker = get_tracker()
+    tracker.record("films:0:hot")
+    tracker.record("films:0:hot")
+    tracker.record("films:0:cold")
+
+    assert tracker.admit("films:0:hot", "films:0:cold")
+    assert not tracker.admit("films:0:cold", "films:0:hot")
+    # При равной частоте остаётся старый ключ.
+    assert not tracker.admit("films:0:new", "films:0:other")
+
+
+@pytest.mark.parametrize(
+    "records, expected",
+    [(0, 5), (1, 10), (2, 20), (3, 20), (4, 40), (100, 40)],
+)
+def test_adapt_ttl(records, expected):
+    tracker = get_tracker()
+    for _ in range(records):
+        tracker.record("films:0:1")
+
+    assert tracker.adapt_ttl("films:0:1", 10) == expected
+
+
+def test_adapt_ttl_is_at_least_one_second():
+    assert get_tracker().adapt_ttl("films:0:1", 1) == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_admission():
+    """Заполненный L1 не принимает ключ, к которому обращаются реже, чем к вытесняемому."""
+    tracker = get_tracker()
+    storage = InMemoryCacheStorage(2, 1024 * 1024, frequency=tracker)
+    for key in ("films:0:a", "films:0:b"):
+        tracker.record(key)
+        await storage.save_cache(key, b"value")
+
+    await storage.save_cache("films:0:rare", b"value")
+    assert await storage.retrieve_cache("films:0:rare") is None
+    assert storage.rejections == 1
+
+    tracker.record("films:0:hot")
+    tracker.record("films:0:hot")
+    await storage.save_cache("films:0:hot", b"value")
+    assert await storage.retrieve_cache("films:0:hot") == b"value"
+    assert await storage.retrieve_cache("films:0:a") is None
+    assert storage.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_admission_updates_existing_key():
+    tracker = get_tracker()
+    storage = InMemoryCacheStorage(1, 1024 * 1024, frequency=tracker)
+    await storage.save_cache("films:0:a", b"old")
+    await storage.save_cache("films:0:a", b"new")
+
+    assert await storage.retrieve_cache("films:0:a") == b"new"
+    assert storage.rejections == 0
+
+
+@pytest.mark.asyncio
+async def test_set_entry_adapts_ttl(monkeypatch):
+    tracker = get_tracker()
+    monkeypatch.setattr(frequency, "tracker", tracker)
+    storage = RecordingStorage()
+    cache = Cache(storage)
+    for _ in range(4):
+        await cache.get_entry("films:0:hot")
+
+    await cache.set_entry("films:0:hot", {"id": "hot"}, 10, stale_ttl=5)
+    await cache.set_entry("films:0:cold", {"id": "cold"}, 10, stale_ttl=5)
+
+    assert storage.expires == {"films:0:hot": 45, "films:0:cold": 10}
+
+
+@pytest.mark.asyncio
+async def test_set_entry_does_not_extend_negative_entries(monkeypatch):
+    """Частые запросы несуществующего объекта не продлевают отрицательную запись."""
+    tracker = get_tracker()
+    monkeypatch.setattr(frequency, "tracker", tracker)
+    storage = RecordingStorage()
+    cache = Cache(storage)
+    for _ in range(4):
+        await cache.get_entry("films:0:missing")
+
+    await cache.set_entry("films:0:missing", None, 10)
+
+    assert storage.expires == {"films:0:missing": 10}
+
+
+@pytest.mark.asyncio
+async def test_set_many_groups_by_adapted_ttl(monkeypatch):
+    tracker = get_tracker()
+    monkeypatch.setattr(frequency, "tracker", tracker)
+    storage = RecordingStorage()
+    cache = Cache(storage)
+    await cache.get_many(["films:0:hot", "films:0:missing"] * 4)
+
+    await cache.set_many({"films:0:hot": {"id": "hot"}, "films:0:cold": {"id": "cold"}, "films:0:missing": None}, 10)
+
+    assert storage.expires == {"films:0:hot": 40, "films:0:cold": 5, "films:0:missing": 10}
+    entries = await cache.get_many(["films:0:hot", "films:0:cold", "films:0:missing"])
+    assert {key: entry.value for key, entry in entries.items()} == {
+        "films:0:hot": {"id": "hot"},
+        "films:0:cold": {"id": "cold"},
+        "films:0:missing": None,
+    }
@@ -0,0 +1,88 @@
+import asyncio
+from contextlib import suppress
+
+import pytest
+from cache import generation
+from cache.cache import Cache
+from cache.generation import CacheGenerations
+from cache.memory import InMemoryCacheStorage
+from services import genre_registry
+from services.genre import GenreService
+from services.genre_registry import GenreRegistry
+
+DRAMA = {"id": "1f9b7a5c-1c3e-4f3a-9d1e-0a5f1b2c3d4e", "name": "Drama"}
+SCI_FI = {"id": "6c162475-c7ed-4461-9184-001ef3d9f26e", "name": "Sci-Fi"}
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values = {}
+
+    async def get(self, key: str):
+        return self.values.get(key)
+
+    async def incr(self, key: str) -> int:
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+
+class FakeElastic:
+    async def search(self, *args, **kwargs):
+        raise AssertionError("жанр должен браться из справочника без запроса в elasticsearch")
+
+
+@pytest.fixture
+def genres(monkeypatch):
+    """Документы индекса жанров, которые возвращает обход индекса."""
+    docs = [DRAMA]
+
+    async def fake_scan(*args, **kwargs):
+        for doc in list(docs):
+            yield {"_source": doc}
+
+    monkeypatch.setattr(genre_registry, "async_scan", fake_scan)
+    return docs
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    generations = CacheGenerations(FakeRedis(), refresh_interval=0)
+    monkeypatch.setattr(generation, "generations", generations)
+    return generations
+
+
+@pytest.mark.asyncio
+async def test_genre_service_uses_registry(monkeypatch, genres, generations):
+    registry = GenreRegistry(elastic=None)
+    await registry.load()
+    monkeypatch.setattr(genre_registry, "registry", registry)
+    service = GenreService(Cache(InMemoryCacheStorage(100, 1024 * 1024)), FakeElastic())
+
+    # Название жанра из фильтра фильмов (?filter_by=genre&query=...) ищется без учёта регистра и пробелов.
+    assert (await service.get_genre_by_name(" drama ")).id == DRAMA["id"]
+    assert await service.get_genre_by_name("Comedy") is None
+    assert [genre.id for genre in await service.get_genres_by_names(["DRAMA", "Comedy"])] == [DRAMA["id"]]
+
+
+@pytest.mark.asyncio
+async def test_registry_reloads_after_genres_change(genres, generations):
+    registry = GenreRegistry(elastic=None)
+    await registry.load()
+    assert registry.get_by_name("sci-fi") is None
+
+    task = asyncio.create_task(registry.run(check_interval=0.01, refresh_interval=3600))
+    try:
+        genres.append(SCI_FI)
+        # Публикация изменений жанров увеличивает поколение их списков (см. publish_changes).
+        await generations.bump(generation.get_lists_namespace("genres"))
+        for _ in range(100):
+            if registry.get_by_name("sci-fi"):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    assert registry.get_by_name("SCI-FI").id == SCI_FI["id"]
+    assert registry.version == 1
@@ -0,0 +1,74 @@
+from urllib.parse import parse_qsl
+
+import pytest
+from cache.keys import MAX_KEY_LENGTH, build_cache_key
+from services.base import BaseService
+
+
+async def get_key(query_string: str, path: str = "/api/v1/films") -> str:
+    """Ключ списка для строки запроса - так же, как в BaseService.get_objects."""
+    params = await BaseService(cache=None, elastic=None)._get_correct_params(dict(parse_qsl(query_string)))
+    return build_cache_key(path, params)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        # Значения по умолчанию.
+        ("", "page=1"),
+        ("", "per_page=50"),
+        ("", "page=1&per_page=50"),
+        # Порядок параметров.
+        ("page=2&per_page=10", "per_page=10&page=2"),
+        ("genre=Drama&sort_by=-imdb_rating", "sort_by=-imdb_rating&genre=Drama"),
+        # Пустые значения.
+        ("title=", ""),
+        ("page=2&query=", "page=2"),
+        # Регистр и пробелы анализируемых полей.
+        ("query=Star", "query=star"),
+        ("query=%20Star%20", "query=star"),
+        ("genre=DRAMA", "genre=drama"),
+    ],
+)
+async def test_equivalent_queries_share_key(first, second):
+    assert await get_key(first) == await get_key(second)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("page=1", "page=2"),
+        ("per_page=10", "per_page=20"),
+        ("sort_by=imdb_rating", "sort_by=-imdb_rating"),
+        ("sort_by=imdb_rating", ""),
+        ("genre=Drama", "genre=Comedy"),
+        ("genre=Drama", "title=Drama"),
+        ("title=Star", "description=Star"),
+        ("imdb_rating_gte=5", "imdb_rating_lte=5"),
+        ("imdb_rating=5", "imdb_rating_gte=5"),
+        # Регистр учитывается только у анализируемых полей.
+        ("title=Star", "title=star"),
+        # Значение одного параметра не должно склеиваться с именем другого.
+        ("title=a%26genre%3Db", "title=a&genre=b"),
+    ],
+)
+async def test_different_queries_do_not_collide(first, second):
+    assert await get_key(first) != await get_key(second)
+
+
+@pytest.mark.asyncio
+async def test_path_is_part_of_key():
+    assert await get_key("query=star", "/api/v1/films/search") != await get_key("query=star", "/api/v1/persons/search")
+    assert await get_key("", "/api/v1/films/") == await get_key("", "/api/v1/films")
+
+
+def test_long_key_is_hashed():
+    short = build_cache_key("/api/v1/films", {"title": "a" * 10})
+    long = build_cache_key("/api/v1/films", {"title": "a" * MAX_KEY_LENGTH})
+    other = build_cache_key("/api/v1/films", {"title": "b" * MAX_KEY_LENGTH})
+
+    assert short == "/api/v1/films?title=aaaaaaaaaa"
+    assert len(long) < MAX_KEY_LENGTH
+    assert long != other
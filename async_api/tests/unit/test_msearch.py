@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+from db.msearch import SearchBatcher
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig, ObjectApiResponse
+from elasticsearch import ConnectionError, NotFoundError
+
+META = ApiResponseMeta(
+    status=200, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=NodeConfig("http", "localhost", 9200)
+)
+
+
+def get_hits(name: str) -> dict:
+    return {"hits": {"hits": [{"_source": {"id": name}}]}}
+
+
+class FakeElastic:
+    """Клиент elasticsearch: ответ поиска - документ с id, равным запросу, ошибки задаются по запросу."""
+
+    def __init__(self, errors: dict | None = None, fail: Exception | None = None) -> None:
+        self.errors = errors or {}
+        self.fail = fail
+        self.searches = []
+        self.msearches = []
+
+    async def search(self, index=None, **kwargs):
+        self.searches.append((index, kwargs))
+        if self.fail:
+            raise self.fail
+        return ObjectApiResponse(body=get_hits(kwargs["query"]), meta=META)
+
+    async def msearch(self, searches):
+        self.msearches.append(searches)
+        if self.fail:
+            raise self.fail
+        responses = []
+        for body in searches[1::2]:
+            if body["query"] in self.errors:
+                responses.append({"error": {"type": "index_not_found_exception"}, "status": self.errors[body["query"]]})
+            else:
+                responses.append({**get_hits(body["query"]), "status": 200})
+        return ObjectApiResponse(body={"responses": responses}, meta=META)
+
+
+def get_ids(response) -> list:
+    return [hit["_source"]["id"] for hit in response.body["hits"]["hits"]]
+
+
+@pytest.mark.asyncio
+async def test_searches_in_window_share_msearch():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=5, max_batch=32)
+
+    responses = await asyncio.gather(
+        *(batcher.search(index="movies", query=name, size=10, source_includes=["id"]) for name in ("a", "b", "c"))
+    )
+
+    # Каждому запросу - его ответ, в том же порядке.
+    assert [get_ids(response) for response in responses] == [["a"], ["b"], ["c"]]
+    assert elastic.searches == []
+    assert elastic.msearches == [
+        [
+            {"index": "movies"}, {"query": "a", "size": 10, "_source": {"includes": ["id"]}},
+            {"index": "movies"}, {"query": "b", "size": 10, "_source": {"includes": ["id"]}},
+            {"index": "movies"}, {"query": "c", "size": 10, "_source": {"includes": ["id"]}},
+        ]
+    ]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["searches"] == 3
+
+
+@pytest.mark.asyncio
+async def test_searches_after_window_are_sent_separately():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=1, max_batch=32)
+
+    first = await batcher.search(index="movies", query="a")
+    second = await batcher.search(index="movies", query="b")
+
+    assert (get_ids(first), get_ids(second)) == (["a"], ["b"])
+    # Одиночный запрос отправляется обычным search, без _msearch.
+    assert elastic.searches == [("movies", {"query": "a"}), ("movies", {"query": "b"})]
+    assert elastic.msearches == []
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting_for_window():
+    elastic = FakeElastic()
+    # Окно больше таймаута теста: дождаться ответа можно, только если пакет отправлен по max_batch.
+    batcher = SearchBatcher(elastic, window_ms=60_000, max_batch=2)
+
+    responses = await asyncio.wait_for(
+        asyncio.gather(batcher.search(index="movies", query="a"), batcher.search(index="movies", query="b")),
+        timeout=1,
+    )
+
+    assert [get_ids(response) for response in responses] == [["a"], ["b"]]
+    assert len(elastic.msearches) == 1
+    assert batcher._timer is None
+
+
+@pytest.mark.asyncio
+async def test_error_is_returned_only_to_its_search():
+    elastic = FakeElastic(errors={"b": 404})
+    batcher = SearchBatcher(elastic, window_ms=5, max_batch=32)
+
+    results = await asyncio.gather(
+        *(batcher.search(index="movies", query=name) for name in ("a", "b", "c")), return_exceptions=True
+    )
+
+    assert get_ids(results[0]) == ["a"]
+    assert isinstance(results[1], NotFoundError)
+    assert results[1].meta.status == 404
+    assert get_ids(results[2]) == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_transport_error_is_returned_to_all_searches():
+    error = ConnectionError("connection refused")
+    batcher = SearchBatcher(FakeElastic(fail=error), window_ms=5, max_batch=32)
+
+    results = await asyncio.gather(
+        *(batcher.search(index="movies", query=name) for name in ("a", "b")), return_exceptions=True
+    )
+
+    assert results == [error, error]
+
+
+@pytest.mark.asyncio
+async def test_pit_search_has_no_index():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=5, max_batch=32)
+    pit = {"id": "pit-id", "keep_alive": "1m"}
+
+    await asyncio.gather(
+        batcher.search(pit=pit, search_after=[8.6, "a"], query="a"),
+        batcher.search(index="movies", query="b"),
+    )
+
+    assert elastic.msearches[0][:2] == [{}, {"pit": pit, "search_after": [8.6, "a"], "query": "a"}]
+
+
+@pytest.mark.asyncio
+async def test_unsupported_params_bypass_batch():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=60_000, max_batch=32)
+
+    response = await asyncio.wait_for(batcher.search(index="movies", query="a", track_total_hits=True), timeout=1)
+
+    assert get_ids(response) == ["a"]
+    assert elastic.searches == [("movies", {"query": "a", "track_total_hits": True})]
+    assert batcher.stats()["batches"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_search_does_not_break_batch():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=5, max_batch=32)
+    cancelled = asyncio.create_task(batcher.search(index="movies", query="a"))
+    other = asyncio.create_task(batcher.search(index="movies", query="b"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert get_ids(await other) == ["b"]
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_close_sends_pending_searches():
+    elastic = FakeElastic()
+    batcher = SearchBatcher(elastic, window_ms=60_000, max_batch=32)
+    pending = asyncio.create_task(batcher.search(index="movies", query="a"))
+    await asyncio.sleep(0)
+
+    await batcher.close()
+
+    assert get_ids(await pending) == ["a"]
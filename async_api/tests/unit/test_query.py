@@ -0,0 +1,22 @@
+from services.query import build_query
+
+
+def test_genre_filter_falls_back_to_phrase():
+    """Жанр ищется по genres.raw и фразой в genres: индекс без подполя raw тоже находит фильмы."""
+    query = build_query("/api/v1/films", {"filter_by": "genre", "query": "sci-fi", "genre": "Sci-Fi"})
+
+    assert query == {
+        "bool": {
+            "filter": [
+                {
+                    "bool": {
+                        "should": [
+                            {"term": {"genres.raw": {"value": "Sci-Fi", "case_insensitive": True}}},
+                            {"match_phrase": {"genres": {"query": "Sci-Fi"}}},
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                }
+            ]
+        }
+    }
@@ -0,0 +1,87 @@
+import time
+from typing import List
+
+import pytest
+from cache import frequency, surrogate
+from cache.cache import Cache, TieredCacheStorage
+from cache.frequency import FrequencyTracker
+from cache.memory import InMemoryCacheStorage
+from services import response_cache as response_cache_module
+from services.response_cache import ResponseCache
+from starlette.requests import Request
+
+
+def make_request(path: str, query_string: bytes = b"") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query_string, "headers": []})
+
+
+class FakeSurrogateKeys:
+    def __init__(self) -> None:
+        self.registered = []
+
+    async def register(self, url: str, surrogate_keys) -> None:
+        self.registered.append((url, list(surrogate_keys)))
+
+
+@pytest.mark.asyncio
+async def test_response_is_admitted_to_full_memory_cache(monkeypatch):
+    """Популярный ответ попадает в заполненный L1: обращения к ключам ответов учитываются в TinyLFU."""
+    tracker = FrequencyTracker(width=1024, depth=4, sample_size=10_000, min_ttl_factor=1, max_ttl_factor=1)
+    monkeypatch.setattr(frequency, "tracker", tracker)
+    memory = InMemoryCacheStorage(max_entries=2, max_bytes=1024 * 1024, frequency=tracker)
+    # Второй уровень в памяти вместо Redis.
+    cache = Cache(TieredCacheStorage({"memory": memory, "redis": InMemoryCacheStorage(100, 1024 * 1024)}))
+    for key in ("films:0:first", "films:0:second"):
+        await cache.set_entry(key, {"id": key}, 300)
+        await cache.get_entry(key)
+
+    response_cache = ResponseCache(cache, make_request("/api/v1/films"))
+    key = await response_cache.get_key(["films"])
+    assert await response_cache.get(key) is None
+    await response_cache.put(key, List[str], ["film"], 300)
+    # Первое обращение не вытесняет ключи, к которым обращались так же часто.
+    assert await memory.retrieve_cache(key) is None
+
+    # Повторное обращение отдаётся из второго уровня и уже допускается в L1.
+    response = await response_cache.get(key)
+    assert response.body == b'["film"]'
+    assert await memory.retrieve_cache(key) is not None
+    assert memory.rejections == 1
+
+
+@pytest.mark.asyncio
+async def test_surrogate_keys_are_registered_on_put(monkeypatch):
+    """Surrogate-ключи регистрируются при записи ответа, а не при каждом попадании."""
+    surrogate_keys = FakeSurrogateKeys()
+    monkeypatch.setattr(surrogate, "surrogate_keys", surrogate_keys)
+    monkeypatch.setattr(frequency, "tracker", None)
+    cache = Cache(InMemoryCacheStorage(100, 1024 * 1024))
+
+    response_cache = ResponseCache(cache, make_request("/api/v1/films"))
+    key = await response_cache.get_key(["films"], {"page": 1})
+    await response_cache.put(key, List[str], ["film"], 300, surrogate_keys=["films"])
+    for _ in range(3):
+        assert await response_cache.get(key) is not None
+    assert surrogate_keys.registered == [("/api/v1/films", ["films"])]
+
+    # Тот же ответ по другому URL: nginx кэширует его отдельно, поэтому URL регистрируется.
+    other = ResponseCache(cache, make_request("/api/v1/films", b"page=1"))
+    assert await other.get_key(["films"], {"page": 1}) == key
+    assert await other.get(key) is not None
+    assert surrogate_keys.registered[-1] == ("/api/v1/films?page=1", ["films"])
+
+
+@pytest.mark.asyncio
+async def test_expired_response_is_miss(monkeypatch):
+    """Ответ, который хранилище ещё не удалило, после своего срока считается промахом."""
+    monkeypatch.setattr(frequency, "tracker", None)
+    cache = Cache(InMemoryCacheStorage(100, 1024 * 1024))
+    response_cache = ResponseCache(cache, make_request("/api/v1/films"))
+    key = await response_cache.get_key(["films"])
+    await response_cache.put(key, List[str], ["film"], 300)
+    assert await response_cache.get(key) is not None
+
+    now = time.time()
+    monkeypatch.setattr(response_cache_module.time, "time", lambda: now + 300)
+
+    assert await response_cache.get(key) is None
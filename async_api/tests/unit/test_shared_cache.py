@@ -0,0 +1,189 @@
+import time
+
+import pytest
+from cache import shared
+from cache.shared import SLOT_HEADER, SharedMemoryCacheStorage
+
+NAMESPACE_TTLS = {"films": 300}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SharedMemoryCacheStorage(str(tmp_path / "cache"), 16, 256, namespace_ttls=NAMESPACE_TTLS)
+    yield storage
+    storage.close()
+
+
+def get_header(storage: SharedMemoryCacheStorage, key: str) -> tuple:
+    return SLOT_HEADER.unpack_from(storage._mmap, storage._get_offset(storage._hash(key)))
+
+
+def set_seq(storage: SharedMemoryCacheStorage, key: str, seq: int) -> None:
+    """Записать seq слота, не трогая остальной заголовок, - как писатель, упавший посреди записи."""
+    offset = storage._get_offset(storage._hash(key))
+    shared.SLOT_SEQ.pack_into(storage._mmap, offset, seq)
+
+
+def write_slot(storage: SharedMemoryCacheStorage, key: str, value: bytes) -> None:
+    """Записать слот так же, как save_cache, но синхронно - из середины чтения."""
+    key_hash = storage._hash(key)
+    offset = storage._get_offset(key_hash)
+    seq = storage._begin_write(offset)
+    data_offset = offset + SLOT_HEADER.size
+    storage._mmap[data_offset:data_offset + len(value)] = value
+    storage._end_write(offset, seq, key_hash, float("inf"), len(value))
+
+
+class InterruptingHeader:
+    """Заголовок слота, перед повторной проверкой seq которого другой писатель перезаписывает слот."""
+
+    size = SLOT_HEADER.size
+
+    def __init__(self, storage: SharedMemoryCacheStorage, key: str, value: bytes, interruptions: int) -> None:
+        self.storage = storage
+        self.key = key
+        self.value = value
+        self.interruptions = interruptions
+        self.reads = 0
+
+    def pack_into(self, *args):
+        SLOT_HEADER.pack_into(*args)
+
+    def unpack_from(self, buffer, offset):
+        self.reads += 1
+        # Чётные чтения - проверка seq после копирования значения.
+        if self.reads % 2 == 0 and self.interruptions:
+            self.interruptions -= 1
+            write_slot(self.storage, self.key, self.value)
+        return SLOT_HEADER.unpack_from(buffer, offset)
+
+
+@pytest.mark.asyncio
+async def test_round_trip(storage):
+    await storage.save_cache("films:0:1", b"value")
+
+    assert await storage.retrieve_cache("films:0:1") == b"value"
+    assert get_header(storage, "films:0:1")[0] % 2 == 0
+    assert storage.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_between_storages(storage):
+    """Значение, записанное одним процессом, видно другому процессу с тем же файлом."""
+    other = SharedMemoryCacheStorage(storage.path, storage.slots, storage.slot_size)
+    try:
+        await storage.save_cache("films:0:1", "value")
+        assert await other.retrieve_cache("films:0:1") == b"value"
+    finally:
+        other.close()
+
+
+@pytest.mark.asyncio
+async def test_too_large_value_is_not_cached(storage):
+    await storage.save_cache("films:0:1", b"x" * storage.slot_size)
+
+    assert await storage.retrieve_cache("films:0:1") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "key, expire, expected_ttl",
+    [
+        ("films:0:1", 10, 10),
+        ("films:0:1", 1000, 300),
+        ("films:0:1", None, 300),
+        ("persons:0:1", 1000, 1000),
+        ("persons:0:1", None, None),
+    ],
+)
+async def test_namespace_ttl(storage, key, expire, expected_ttl):
+    await storage.save_cache(key, b"value", expire)
+    _, ttl = await storage.retrieve_with_ttl(key)
+
+    if expected_ttl is None:
+        assert ttl is None
+    else:
+        assert expected_ttl - 1 < ttl <= expected_ttl
+
+
+@pytest.mark.asyncio
+async def test_expired_value_is_miss(storage, monkeypatch):
+    await storage.save_cache("films:0:1", b"value", 10)
+    now = time.time()
+    monkeypatch.setattr(shared.time, "time", lambda: now + 11)
+
+    assert await storage.retrieve_cache("films:0:1") is None
+
+
+@pytest.mark.asyncio
+async def test_slot_being_written_is_miss(storage):
+    """Пока seq нечётный, читатель повторяет чтение MAX_READ_ATTEMPTS раз и считает слот промахом."""
+    await storage.save_cache("films:0:1", b"value")
+    seq = get_header(storage, "films:0:1")[0]
+    set_seq(storage, "films:0:1", seq + 1)
+
+    assert await storage.retrieve_cache("films:0:1") is None
+    assert storage.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_read_retries_after_concurrent_write(storage, monkeypatch):
+    await storage.save_cache("films:0:1", b"old")
+    header = InterruptingHeader(storage, "films:0:1", b"new", interruptions=1)
+    monkeypatch.setattr(shared, "SLOT_HEADER", header)
+
+    assert await storage.retrieve_cache("films:0:1") == b"new"
+    assert header.reads == 4
+
+
+@pytest.mark.asyncio
+async def test_read_gives_up_after_max_attempts(storage, monkeypatch):
+    await storage.save_cache("films:0:1", b"old")
+    header = InterruptingHeader(storage, "films:0:1", b"new", interruptions=SharedMemoryCacheStorage.MAX_READ_ATTEMPTS)
+    monkeypatch.setattr(shared, "SLOT_HEADER", header)
+
+    assert await storage.retrieve_cache("films:0:1") is None
+    assert storage.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_recovers_slot_left_odd(storage):
+    """Писатель упал между двумя записями seq: следующая запись возвращает слот в рабочее состояние."""
+    await storage.save_cache("films:0:1", b"old")
+    seq = get_header(storage, "films:0:1")[0]
+    set_seq(storage, "films:0:1", seq + 1)
+
+    await storage.save_cache("films:0:1", b"new")
+
+    assert get_header(storage, "films:0:1")[0] % 2 == 0
+    assert get_header(storage, "films:0:1")[0] > seq
+    assert await storage.retrieve_cache("films:0:1") == b"new"
+
+
+@pytest.mark.asyncio
+async def test_delete(storage):
+    await storage.save_cache("films:0:1", b"value")
+    seq = get_header(storage, "films:0:1")[0]
+
+    await storage.delete_cache("films:0:1")
+
+    new_seq, slot_hash, _, length = get_header(storage, "films:0:1")
+    assert new_seq % 2 == 0 and new_seq > seq
+    assert (slot_hash, length) == (0, 0)
+    assert await storage.retrieve_cache("films:0:1") is None
+
+
+@pytest.mark.asyncio
+async def test_delete_keeps_other_key(storage):
+    """Удаление ключа, вытесненного из слота при коллизии, не трогает новое значение слота."""
+    other_key = next(
+        f"films:0:{i}"
+        for i in range(2, 1000)
+        if storage._get_offset(storage._hash(f"films:0:{i}")) == storage._get_offset(storage._hash("films:0:1"))
+    )
+    await storage.save_cache("films:0:1", b"old")
+    await storage.save_cache(other_key, b"new")
+
+    await storage.delete_cache("films:0:1")
+
+    assert await storage.retrieve_cache(other_key) == b"new"
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from cache import singleflight
+from cache.cache import Cache
+from cache.memory import InMemoryCacheStorage
+from cache.singleflight import NOT_CACHED, RedisLockCoalescer
+from services import base
+from services.film import FilmService
+
+
+class FakeLock:
+    def __init__(self, locks: set, name: str) -> None:
+        self.locks = locks
+        self.name = name
+
+    async def acquire(self, blocking: bool = True) -> bool:
+        if self.name in self.locks:
+            return False
+        self.locks.add(self.name)
+        return True
+
+    async def release(self) -> None:
+        self.locks.discard(self.name)
+
+    async def locked(self) -> bool:
+        return self.name in self.locks
+
+
+class FakeRedis:
+    """Блокировки Redis, общие для всех "процессов" теста."""
+
+    def __init__(self) -> None:
+        self.locks = set()
+
+    def lock(self, name: str, timeout: float) -> FakeLock:
+        return FakeLock(self.locks, name)
+
+
+@pytest.mark.asyncio
+async def test_waiters_return_negative_entry():
+    """Отрицательная запись, положенная держателем блокировки, отдаётся ожидающим без повторной загрузки."""
+    coalescer = RedisLockCoalescer(FakeRedis(), timeout_ms=1000, poll_interval_ms=5)
+    cache = {}
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        cache["films:0:missing"] = None
+        return None
+
+    async def get_cached():
+        return cache.get("films:0:missing", NOT_CACHED)
+
+    results = await asyncio.gather(*(coalescer.run("films:0:missing", load, get_cached) for _ in range(5)))
+
+    assert results == [None] * 5
+    assert loads == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_return_cached_value():
+    coalescer = RedisLockCoalescer(FakeRedis(), timeout_ms=1000, poll_interval_ms=5)
+    cache = {}
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.05)
+        cache["films:0:id"] = {"id": "id"}
+        return {"id": "id"}
+
+    async def get_cached():
+        return cache.get("films:0:id", NOT_CACHED)
+
+    results = await asyncio.gather(*(coalescer.run("films:0:id", load, get_cached) for _ in range(3)))
+
+    assert results == [{"id": "id"}] * 3
+    assert loads == 1
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_of_raw_page(monkeypatch):
+    """Фоновое обновление страницы списка (raw) при распределённой блокировке не валидирует её как модель."""
+    redis = FakeRedis()
+    monkeypatch.setattr(singleflight, "lock_coalescer", RedisLockCoalescer(redis, timeout_ms=1000, poll_interval_ms=5))
+    service = FilmService(Cache(InMemoryCacheStorage(100, 1024 * 1024)), elastic=None)
+    key = "films:lists:0:/api/v1/films?page=1"
+    page = {"ids": ["id"], "total": 1, "next_cursor": None}
+    # Устаревшая запись, которую обновляет другой процесс.
+    await service.cache.set_entry(key, page, expire=0, stale_ttl=60)
+    redis.locks.add(f"lock:{key}")
+
+    async def loader():
+        raise AssertionError("страницу загружает процесс, захвативший блокировку")
+
+    assert await service._get_or_load(key, loader, raw=True) == page
+    results = await asyncio.gather(*base._background_tasks, return_exceptions=True)
+    assert results == [page]
@@ -0,0 +1,42 @@
+import time
+
+from cache.memory import InMemoryCacheStorage
+from cache.snapshot import dump_snapshot, load_snapshot
+
+GENERATIONS = {"films": 1, "films:lists": 5, "persons": 1, "persons:lists": 2, "genres": 0, "genres:lists": 0}
+
+
+def dump(path: str) -> None:
+    expires_at = time.time() + 300
+    entries = [
+        ("films:1:deleted", expires_at, b"film"),
+        ("films:lists:5:/api/v1/films?page=1", expires_at, b"page"),
+        ("persons:1:person", expires_at, b"person"),
+    ]
+    dump_snapshot(entries, path, GENERATIONS)
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot")
+    dump(path)
+    storage = InMemoryCacheStorage(max_entries=100, max_bytes=1024 * 1024)
+
+    assert load_snapshot(storage, path, GENERATIONS) == 3
+
+
+def test_changed_namespace_is_not_loaded(tmp_path):
+    """Объект, удалённый после сохранения снимка (публикация увеличила поколение списков), не восстанавливается."""
+    path = str(tmp_path / "snapshot")
+    dump(path)
+    storage = InMemoryCacheStorage(max_entries=100, max_bytes=1024 * 1024)
+
+    assert load_snapshot(storage, path, {**GENERATIONS, "films:lists": 6}) == 1
+    assert set(key for key, _, _ in storage.export_entries(100)) == {"persons:1:person"}
+
+
+def test_unknown_format_is_ignored(tmp_path):
+    path = tmp_path / "snapshot"
+    path.write_bytes(b"ACS1" + bytes(16))
+    storage = InMemoryCacheStorage(max_entries=100, max_bytes=1024 * 1024)
+
+    assert load_snapshot(storage, str(path), GENERATIONS) == 0
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+from cache.cache import RedisCacheStorage, TieredCacheStorage
+from cache.memory import InMemoryCacheStorage
+
+NAMESPACE_TTLS = {"films": 300}
+
+
+def get_expires_in(storage: InMemoryCacheStorage, key: str) -> float:
+    for entry_key, expires_at, _ in storage.export_entries(100):
+        if entry_key == key:
+            return expires_at - time.time()
+    raise KeyError(key)
+
+
+@pytest.mark.asyncio
+async def test_copy_keeps_remaining_ttl():
+    """Значение из нижнего уровня копируется в верхний на оставшийся срок, а не на срок пространства имён."""
+    memory = InMemoryCacheStorage(100, 1024 * 1024, namespace_ttls=NAMESPACE_TTLS)
+    lower = InMemoryCacheStorage(100, 1024 * 1024, namespace_ttls=NAMESPACE_TTLS)
+    storage = TieredCacheStorage({"memory": memory, "redis": lower})
+    await lower.save_cache("films:0:negative", b"body", 2)
+
+    assert await storage.retrieve_cache("films:0:negative") == b"body"
+    assert 0 < get_expires_in(memory, "films:0:negative") <= 2
+
+
+@pytest.mark.asyncio
+async def test_copy_many_keeps_remaining_ttl():
+    memory = InMemoryCacheStorage(100, 1024 * 1024, namespace_ttls=NAMESPACE_TTLS)
+    lower = InMemoryCacheStorage(100, 1024 * 1024, namespace_ttls=NAMESPACE_TTLS)
+    storage = TieredCacheStorage({"memory": memory, "redis": lower})
+    await lower.save_cache("films:0:short", b"short", 2)
+    await lower.save_cache("films:0:long", b"long", 100)
+
+    assert await storage.retrieve_many(["films:0:short", "films:0:long"]) == {
+        "films:0:short": b"short",
+        "films:0:long": b"long",
+    }
+    assert get_expires_in(memory, "films:0:short") <= 2
+    assert 2 < get_expires_in(memory, "films:0:long") <= 100
+
+
+@pytest.mark.asyncio
+async def test_copy_from_redis_expires_with_redis():
+    fakeredis = pytest.importorskip("fakeredis.aioredis")
+    redis = RedisCacheStorage(fakeredis.FakeRedis())
+    memory = InMemoryCacheStorage(100, 1024 * 1024, namespace_ttls=NAMESPACE_TTLS)
+    storage = TieredCacheStorage({"memory": memory, "redis": redis})
+    await redis.save_cache("films:0:id", b"body", 2)
+    await redis.save_cache("films:0:forever", b"forever")
+
+    assert await storage.retrieve_cache("films:0:id") == b"body"
+    assert await storage.retrieve_many(["films:0:forever"]) == {"films:0:forever": b"forever"}
+    assert get_expires_in(memory, "films:0:id") <= 2
+    # Ключ Redis без срока хранится в L1 по сроку пространства имён.
+    assert 2 < get_expires_in(memory, "films:0:forever") <= 300
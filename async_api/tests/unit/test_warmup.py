@@ -0,0 +1,168 @@
+import asyncio
+
+import orjson
+import pytest
+from fastapi import FastAPI, Request
+
+import cli
+from cache import generation
+from cache.cache import Cache
+from cache.memory import InMemoryCacheStorage
+from services import warmup
+from services.film import FilmService
+
+FILM = {
+    "id": "3d825f60-9fff-4dfe-b294-1a45fa1e115d",
+    "title": "Star Wars",
+    "description": None,
+    "imdb_rating": 8.6,
+    "genres": ["Action"],
+    "directors": [],
+    "actors": [],
+    "writers": [],
+    "directors_names": [],
+    "actors_names": [],
+    "writers_names": [],
+}
+
+
+class FakeRedis:
+    """Поколения кэша в Redis."""
+
+    def __init__(self, values: dict) -> None:
+        self.values = values
+
+    async def get(self, key: str):
+        return self.values.get(key)
+
+    def lock(self, name: str, timeout: float) -> "FakeLock":
+        return FakeLock(self.values, name, timeout)
+
+    async def incr(self, key: str) -> int:
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeLock:
+    """Блокировка redis-py: захвачена, пока её имя есть в values."""
+
+    def __init__(self, values: dict, name: str, timeout: float) -> None:
+        self.values = values
+        self.name = name
+        self.timeout = timeout
+
+    async def acquire(self, blocking: bool = True) -> bool:
+        assert not blocking
+        if self.name in self.values:
+            return False
+        self.values[self.name] = self.timeout
+        return True
+
+
+class FakeElastic:
+    def __init__(self, docs: list) -> None:
+        self.docs = {doc["id"]: doc for doc in docs}
+
+    async def mget(self, index: str, ids: list, source_includes=None):
+        docs = [{"_id": id_, "found": id_ in self.docs, "_source": self.docs.get(id_)} for id_ in ids]
+        return type("Response", (), {"body": {"docs": docs}})()
+
+    async def get(self, *args, **kwargs):
+        raise AssertionError("API не должен обращаться в elasticsearch за прогретым объектом")
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_warmup_keys_match_api_keys(monkeypatch, tmp_path):
+    """Команда warmup пишет ключи с текущими поколениями из Redis, а не с поколением 0."""
+    redis = FakeRedis({"films:generation": b"3", "films:lists:generation": b"7"})
+    storage = InMemoryCacheStorage(max_entries=100, max_bytes=1024 * 1024)
+    monkeypatch.setattr(cli, "Redis", lambda **kwargs: redis)
+    monkeypatch.setattr(cli, "AsyncElasticsearch", lambda **kwargs: FakeElastic([FILM]))
+    monkeypatch.setattr(cli, "build_cache_storage", lambda redis_adapter: storage)
+    monkeypatch.setattr(generation, "generations", None)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_bytes(orjson.dumps({"ids": {"films": [FILM["id"]]}, "pages": []}))
+
+    await cli.warmup(str(manifest))
+
+    # Процесс API читает кэш с поколениями, которые подключаются в lifespan.
+    generation.init_generations(redis)
+    service = FilmService(Cache(storage=storage), FakeElastic([]))
+    assert await service._get_key(FILM["id"]) == f"films:3:{FILM['id']}"
+    film = await service.get_by_id(FILM["id"])
+    assert film.title == FILM["title"]
+
+
+class RecordingWarmer:
+    def __init__(self) -> None:
+        self.manifests = []
+
+    async def warm_up(self, manifest: dict) -> int:
+        self.manifests.append(manifest)
+        await asyncio.sleep(0)
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_once():
+    """Из процессов, запущенных одновременно, прогревает только захвативший блокировку."""
+    redis = FakeRedis({})
+    warmers = [RecordingWarmer() for _ in range(3)]
+
+    results = await asyncio.gather(*(warmup.warm_up_once(redis, warmer, {}, time_budget=10) for warmer in warmers))
+
+    assert sorted(results, key=str) == [1, None, None]
+    assert sum(len(warmer.manifests) for warmer in warmers) == 1
+    # Блокировка не снимается после прогрева и истекает вместе с бюджетом.
+    assert redis.values[warmup.WARMUP_LOCK] == 10
+
+
+def test_manifest_urls():
+    manifest = {
+        "ids": {"films": ["1", "2"], "genres": ["3"]},
+        "pages": [
+            {"path": "/api/v1/genres"},
+            {"path": "/api/v1/films", "params": {"sort_by": "-imdb_rating", "page": 2}},
+        ],
+    }
+
+    assert warmup.get_manifest_urls(manifest) == [
+        "/api/v1/films/1",
+        "/api/v1/films/2",
+        "/api/v1/genres/3",
+        "/api/v1/genres",
+        "/api/v1/films?sort_by=-imdb_rating&page=2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_requests_app(monkeypatch):
+    """После объектов и страниц URL манифеста запрашиваются у приложения - так прогревается ResponseCache."""
+    requested = []
+    app = FastAPI()
+
+    @app.get("/api/v1/films/{film_id}")
+    async def film_details(film_id: str, request: Request):
+        requested.append(str(request.url))
+        return {"id": film_id}
+
+    warmer = warmup.CacheWarmer(
+        Cache(storage=InMemoryCacheStorage(max_entries=100, max_bytes=1024 * 1024)),
+        FakeElastic([FILM]),
+        concurrency=2,
+        batch_size=10,
+        app=app,
+    )
+    monkeypatch.setattr(generation, "generations", None)
+
+    loaded = await warmer.warm_up({"ids": {"films": [FILM["id"], "missing"]}, "pages": []})
+
+    assert loaded == 1
+    assert sorted(requested) == sorted(f"http://warmup/api/v1/films/{id_}" for id_ in (FILM["id"], "missing"))
+    assert await warmer.warm_up_responses({"ids": {"films": [FILM["id"]]}, "pages": [{"path": "/unknown"}]}) == 1